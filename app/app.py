@@ -1,4 +1,4 @@
-# pylint: disable = C0103, R0911, R0912, R0915, W1203
+# pylint: disable = C0103, R0911, R0912, R0915
 
 """The 'app.py' module represents the main script
 of the application that contains program entry
@@ -14,91 +14,82 @@ Version history:
              - updated docstrings
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from os.path import join
 import sys
-import engine.biaController as ctrlr
 
 log = logging.getLogger("master")
 
-def main() -> int:
-    """Program entry point.
+_STAGES = {
+    "init": "=== Initialization ===",
+    "data": "=== Data processing ===",
+    "cases": "=== Case processing ===",
+    "report": "=== Reporting ===",
+    "cleanup": "=== Cleanup ===",
+    "success": "=== Success ===\n",
+    "failure": "=== Failure ===\n"
+}
+
+_APP_DIR = sys.path[0]
+
+_PATHS = {
+    name: join(_APP_DIR, file_name) for name, file_name in (
+        ("log", "log.log"),
+        ("app_cfg", "appconfig.yaml"),
+        ("rules", "rules.yaml"),
+        ("states", "states.json")
+    )
+}
+
+def _stage(name: str):
+    """Logs a processing stage banner."""
+    log.info(_STAGES[name])
+
+def _fail(ret_code: int) -> int:
+    """Logs failure of a processing stage.
 
     Returns:
     --------
     Program completion state.
     """
 
-    logger_ok = ctrlr.initialize_log(
-        cfg_path = join(sys.path[0], "logging.yaml"),
-        log_path = join(sys.path[0], "log.log"),
-        debug = False,
-        header = {
-            "Application name": "CS DMS Closing",
-            "Application version": "1.1.20220513",
-            "Log date": ctrlr.get_current_date("%d-%b-%Y")
-        }
-    )
-
-    if not logger_ok:
-        return 1
+    _stage("failure")
 
-    log.info("=== Initialization ===")
-    cfg = ctrlr.load_app_config(
-        cfg_path = join(sys.path[0], "appconfig.yaml"),
-        states_path = join(sys.path[0], "states.json")
-    )
+    return ret_code
 
-    if cfg is None:
-        return 2
+def _process(ctrlr, cfg: dict, rules: dict, countries: dict, sess) -> int:
+    """Processes data and cases and reports the output.
 
-    rules = ctrlr.load_closing_rules(join(sys.path[0], "rules.yaml"))
+    Params:
+    -------
+    ctrlr:
+        The application controller module imported by main().
 
-    if rules is None:
-        return 3
-
-    countries = ctrlr.get_active_countries(rules)
-
-    if countries is None:
-        return 4
-
-    sess = ctrlr.connect_to_sap(cfg["sap"])
-
-    if sess is None:
-        return 5
-
-    log.info("=== Success ===\n")
+    Returns:
+    --------
+    Program completion state.
+    """
 
-    log.info("=== Data processing ===")
-    if not ctrlr.export_fbl5n_data(cfg["data"], cfg["sap"], cfg["states"], countries, sess):
-        log.info("=== Failure ===\n")
-        log.info("=== Cleanup ===")
-        ctrlr.disconnect_from_sap(sess)
-        log.info("=== Success ===\n")
-        return 6
+    _stage("data")
+    exported, fbl5n_data = ctrlr.export_and_preprocess_fbl5n_data(
+        cfg["data"], cfg["sap"], cfg["states"], rules, countries, sess)
 
-    fbl5n_data = ctrlr.preprocess_fbl5n_data(cfg["data"], rules, countries)
+    if not exported:
+        return _fail(6)
 
     if fbl5n_data is None:
-        log.info("=== Failure ===\n")
-        log.info("=== Cleanup ===")
-        ctrlr.disconnect_from_sap(sess)
-        log.info("=== Success ===\n")
-        return 7
+        return _fail(7)
 
     if not ctrlr.export_dms_data(cfg["data"], cfg["sap"], fbl5n_data, sess):
-        log.info("=== Failure ===\n")
-        log.info("=== Cleanup ===")
-        ctrlr.disconnect_from_sap(sess)
-        log.info("=== Success ===\n")
-        return 8
+        return _fail(8)
 
     dms_data = ctrlr.preprocess_dms_data(cfg["data"])
     closing_input, compacted = ctrlr.process_data(
         fbl5n_data, dms_data, countries.keys(), rules)
-    log.info("=== Success ===\n")
+    _stage("success")
 
-    log.info("=== Case processing ===")
+    _stage("cases")
     if closing_input is None:
         output = compacted
         log.warning("No items to process found.")
@@ -110,40 +101,99 @@ def main() -> int:
             output = ctrlr.process_disputes(closing_input, compacted, sess)
 
         if output is None:
-            log.info("=== Failure ===\n")
-            log.info("=== Cleanup ===")
-            ctrlr.disconnect_from_sap(sess)
-            log.info("=== Success ===\n")
-            return 9
+            return _fail(9)
 
-    log.info("=== Success ===\n")
+    _stage("success")
 
-    log.info("=== Reporting ===")
+    _stage("report")
     reported = ctrlr.report_output(countries,
-        data = compacted,
+        data = output,
         report_cfg = cfg["reports"],
         notif_cfg = cfg["notifications"]
     )
 
     if not reported:
-        log.info("=== Failure ===\n")
-        log.info("=== Cleanup ===")
-        ctrlr.disconnect_from_sap(sess)
-        log.info("=== Success ===\n")
-        return 10
+        return _fail(10)
 
-    log.info("=== Success ===\n")
-
-    log.info("=== Cleanup ===")
-    ctrlr.save_states(join(sys.path[0], "states.json"))
-    ctrlr.disconnect_from_sap(sess)
-    ctrlr.remove_temp_files(cfg["data"]["temp_dir"])
-    log.info("=== Success ===\n")
+    _stage("success")
 
     return 0
 
+def main() -> int:
+    """Program entry point.
+
+    Returns:
+    --------
+    Program completion state.
+    """
+
+    # pandas and the SAP bindings are loaded on the first call only
+    import engine.biaController as ctrlr # pylint: disable = C0415
+
+    ctrlr.reset_today()
+
+    logger_ok = ctrlr.initialize_logger(
+        log_path = _PATHS["log"],
+        debug = False,
+        header = {
+            "Application name": "CS DMS Closing",
+            "Application version": "1.1.20220513",
+            "Log date": ctrlr.get_current_date("%d-%b-%Y")
+        }
+    )
+
+    if not logger_ok:
+        return 1
+
+    _stage("init")
+
+    # SAP GUI scripting objects are bound to the thread that
+    # creates them, hence only the file loads run in the workers
+    executor = ThreadPoolExecutor(max_workers = 2)
+
+    cfg_loading = executor.submit(ctrlr.load_app_config,
+        cfg_path = _PATHS["app_cfg"],
+        states_path = _PATHS["states"]
+    )
+
+    rules_loading = executor.submit(ctrlr.load_closing_rules, _PATHS["rules"])
+    executor.shutdown(wait = False) # the submitted loads still run to completion
+
+    cfg = cfg_loading.result()
+
+    if cfg is None:
+        return 2
+
+    with ctrlr.sap_session(cfg["sap"]) as sess:
+
+        rules = rules_loading.result()
+
+        if rules is None:
+            return 3
+
+        countries = ctrlr.get_active_countries(rules)
+
+        if countries is None:
+            return 4
+
+        if sess is None:
+            return 5
+
+        _stage("success")
+
+        ret_code = _process(ctrlr, cfg, rules, countries, sess)
+
+        _stage("cleanup")
+        if ret_code == 0:
+            ctrlr.save_states(_PATHS["states"])
+            ctrlr.remove_temp_files(cfg["data"]["temp_dir"])
+
+    _stage("success")
+
+    return ret_code
+
 if __name__ == "__main__":
     ret_code = main()
-    log.info(f"=== System shutdown with return code: {ret_code} ===")
+    log.info("=== System shutdown with return code: %d ===", ret_code)
     logging.shutdown()
     sys.exit(ret_code)
@@ -1,4 +1,4 @@
-# pylint: disable = C0103, C0302, E0611, R1711, W0703, W1203
+# pylint: disable = C0103, C0302, E0611, R1711, W0703
 
 """
 The 'biaController.py' module represents the main communication
@@ -12,21 +12,57 @@ Version history
 1.0.20220315 - added initialize_logger() procedure, removed clear_log() procedure
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
 from datetime import datetime, date, timedelta
-from glob import glob
-import json
+from functools import lru_cache
+from glob import escape, glob
+from hashlib import blake2b
+from itertools import chain
 import logging
 from logging import config
-from os import mkdir, remove
+from logging.handlers import QueueHandler, QueueListener
+from os import makedirs, remove, replace, scandir
 from os.path import exists, isfile, join, split
+import pickle
+from queue import Queue
 from shutil import move
 import sys
-from typing import Union
+from typing import Callable, Iterator, Union
 
 import yaml
-from pandas import DataFrame, concat
+from pandas import DataFrame
 from win32com.client import CDispatch
 
+try: # prefer the LibYAML-based parser when PyYAML is built with it
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+try: # orjson serializes in C, the stdlib json module is used if not installed;
+    # values with no JSON type (dates) are stored as their string representation
+    import orjson
+
+    def _load_json(file_path: str):
+        with open(file_path, 'rb') as stream:
+            return orjson.loads(stream.read())
+
+    def _dump_json(obj, file_path: str):
+        with open(file_path, 'wb') as stream:
+            stream.write(orjson.dumps(obj, default = str, option = orjson.OPT_INDENT_2))
+
+except ImportError:
+    import json
+
+    def _load_json(file_path: str):
+        with open(file_path, 'r', encoding = "utf-8") as stream:
+            return json.load(stream)
+
+    def _dump_json(obj, file_path: str):
+        with open(file_path, 'w', encoding = "utf-8") as stream:
+            json.dump(obj, stream, indent = 2, default = str)
+
 from . import biaDMS as dms
 from . import biaFBL5N as fbl5n
 from . import biaMail as mail
@@ -37,6 +73,160 @@ from . import biaDebugger as debug
 
 _logger = logging.getLogger("master")
 
+# built-in copy of the 'logging.yaml' params,
+# used unless a configuration file is provided
+_LOG_CFG = {
+    "version": 1,
+    "disable_existing_loggers": True,
+    "formatters": {
+        "report": {
+            "format": "[%(asctime)s]---%(levelname)s---||%(module)s.%(funcName)s.ln:%(lineno)s||%(message)s",
+            "datefmt": "%H:%M:%S"
+        },
+        "simple": {
+            "format": "%(asctime)s %(name)s: %(message)s"
+        },
+        "extended": {
+            "format": "[%(asctime)s] %(levelname)s: %(message)s",
+            "datefmt": "%H:%M:%S"
+        }
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": "report"
+        },
+        "filehandler": {
+            "class": "logging.FileHandler",
+            "formatter": "report",
+            "filename": "log.log"
+        },
+        "m_filehandler": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "formatter": "extended",
+            "filename": "log.log",
+            "maxBytes": 1048576,
+            "backupCount": 5
+        }
+    },
+    "loggers": {
+        "master": {
+            "handlers": ["console", "m_filehandler"],
+            "propagate": True
+        },
+        "main": {
+            "handlers": ["console", "filehandler"],
+            "propagate": True
+        }
+    }
+}
+
+def _parse_yaml(data: bytes, file_path: str):
+    """
+    Parses YAML data read from a file. The parsed content is pickled \n
+    next to the file, keyed by a hash of the data, so that subsequent \n
+    application runs skip the parsing if the file remains unchanged.
+    """
+
+    digest = blake2b(data, digest_size = 8).hexdigest()
+    cache_path = f"{file_path}.{digest}.pkl"
+
+    if isfile(cache_path):
+        try:
+            with open(cache_path, 'rb') as stream:
+                return pickle.load(stream)
+        except Exception:
+            pass # a damaged cache gets replaced below
+
+    content = yaml.load(data, Loader = _Loader)
+
+    # caches of the previous file versions are no longer valid
+    for stale_path in glob(f"{escape(file_path)}.*.pkl"):
+        try:
+            remove(stale_path)
+        except OSError:
+            pass
+
+    try:
+        with open(cache_path, 'wb') as stream:
+            pickle.dump(content, stream, protocol = pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass # caching is an optimization only
+
+    return content
+
+
+# case status and root cause values valid for DMS closing
+_new_states = {
+    None: dms.CaseStates.Original,
+    2: dms.CaseStates.Solved,
+    3: dms.CaseStates.Closed
+}
+
+_new_root_causes = {
+    None: None,
+    "L06": dms.RootCauses.CREDITNOTE_ISSUED,
+    "L01": dms.RootCauses.PAYMENT_AGREMENT
+}
+
+class _AsyncHandler(QueueHandler):
+    """
+    Passes log records to a handler running in a background \n
+    thread, so that logging calls don't wait for file writes. \n
+    The thread is stopped, writing the pending records, when \n
+    the handler gets closed on logging shutdown.
+    """
+
+    def __init__(self, handler: logging.Handler):
+
+        log_queue = Queue(-1)
+        super().__init__(log_queue)
+        self._listener = QueueListener(log_queue, handler, respect_handler_level = True)
+        self._listener.start()
+
+    def close(self):
+
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+        super().close()
+
+def _load_yaml(file_path: str, substs: dict = None):
+    """
+    Loads a YAML file, replacing 'substs' keys found \n
+    in the text with their values before parsing.
+    """
+
+    if substs is None:
+        substs = {}
+
+    # the raw bytes are hashed and parsed as they are, which
+    # saves decoding the file content into a Python string
+    with open(file_path, 'rb') as stream:
+        data = stream.read()
+
+    for old, new in substs.items():
+        data = data.replace(old.encode("utf-8"), new.encode("utf-8"))
+
+    return _parse_yaml(data, file_path)
+
+# date of the current application run, see reset_today()
+_today = None
+
+def reset_today():
+    """
+    Starts a new application run. The current \n
+    date is read again on the next request.
+    """
+
+    global _today # pylint: disable = W0603
+    _today = None
+
+@lru_cache(maxsize = None)
+def _format_date(day: date, fmt: str) -> str:
+    """Returns a date formatted as a string."""
+    return day.strftime(fmt)
 
 def get_current_date(fmt: str = None) -> Union[str,date]:
     """
@@ -50,18 +240,22 @@ def get_current_date(fmt: str = None) -> Union[str,date]:
 
     Returns:
     --------
-    A string or a datatime.date object representing the current date.
+    A string or a datatime.date object representing the current date. \n
+    The date is read once per application run (see reset_today()).
     """
 
-    curr_date = datetime.now().date()
+    global _today # pylint: disable = W0603
+
+    if _today is None:
+        _today = datetime.now().date()
 
     if fmt is None:
-        return curr_date
+        return _today
 
     if fmt == "":
-        return str(curr_date)
+        return str(_today)
 
-    return curr_date.strftime(fmt)
+    return _format_date(_today, fmt)
 
 def get_past_date(day: date, day_offset: int, fmt: str = None) -> Union[str,date]:
     """
@@ -88,22 +282,19 @@ def get_past_date(day: date, day_offset: int, fmt: str = None) -> Union[str,date
 
     assert day_offset > 0, "A day offset cannot be positive when the new day is in past!"
 
-    past_day = min(day - timedelta(day_offset), day)
+    past_day = day - timedelta(days = day_offset)
 
     if fmt is not None:
         return past_day.strftime(fmt)
 
     return past_day
 
-def initialize_logger(cfg_path: str, log_path: str, header: dict, debug: bool = False) -> bool:
+def initialize_logger(log_path: str, header: dict, debug: bool = False, cfg_path: str = None) -> bool:
     """
     Creates a new or clears an existing log file and prints the log header.
 
     Params:
     ---------
-    cfg_path:
-        Path to a file with logging configuration params.
-
     log_path:
         Path to the application log file.
 
@@ -114,15 +305,21 @@ def initialize_logger(cfg_path: str, log_path: str, header: dict, debug: bool =
     debug:
         Indicates whether debug-level messages should be logged (default False).
 
+    cfg_path:
+        Path to a file with logging configuration params. \n
+        If None is used (default value), then the built-in \n
+        configuration params are used.
+
     Returns:
     --------
     True if logger initialization succeeds, False if it fails.
     """
 
     try:
-        with open(cfg_path, 'r', encoding = "utf-8") as stream:
-            content = stream.read()
-        log_cfg = yaml.safe_load(content)
+        if cfg_path is None:
+            log_cfg = deepcopy(_LOG_CFG)
+        else:
+            log_cfg = _load_yaml(cfg_path)
         config.dictConfig(log_cfg)
     except Exception as exc:
         print (str(exc))
@@ -134,9 +331,12 @@ def initialize_logger(cfg_path: str, log_path: str, header: dict, debug: bool =
         _logger.setLevel(logging.INFO)
 
     prev_file_handler = _logger.handlers.pop(1)
+    prev_file_handler.close()
     new_file_handler = logging.FileHandler(log_path)
     new_file_handler.setFormatter(prev_file_handler.formatter)
-    _logger.addHandler(new_file_handler)
+
+    # records are written to the file from a background thread
+    _logger.addHandler(_AsyncHandler(new_file_handler))
 
     try: # create a new / clear an existing log file
         with open(log_path, 'w', encoding = "utf-8"):
@@ -177,23 +377,19 @@ def load_app_config(cfg_path: str, states_path: str) -> dict:
     _logger.info("Loading application configuration ...")
 
     try:
-        with open(cfg_path, 'r', encoding = "utf-8") as stream:
-            txt = stream.read()
+        cfg = _load_yaml(cfg_path, {"$appdir$": sys.path[0]})
     except Exception as exc:
-        _logger.critical(f"Failed to load application configuration. Reason: {exc}")
+        _logger.critical("Failed to load application configuration. Reason: %s", exc)
         return None
 
-    txt = txt.replace("$appdir$", sys.path[0])
-    cfg = yaml.safe_load(txt)
     cfg.update({"states": {}})
 
     _logger.info("Loading application runtime states ...")
 
     try:
-        with open(states_path, 'r', encoding = "utf-8") as stream:
-            states = json.loads(stream.read())
+        states = _load_json(states_path)
     except Exception as exc:
-        _logger.critical(f"Failed to load application states. Reason: {exc}")
+        _logger.critical("Failed to load application states. Reason: %s", exc)
         return None
 
     cfg["states"].update({"params": {}})
@@ -229,8 +425,7 @@ def load_closing_rules(file_path: str) -> dict:
     _logger.info("Loading closing rules ...")
 
     try:
-        with open(file_path, encoding = "utf-8") as stream:
-            rules = yaml.safe_load(stream.read())
+        rules = _load_yaml(file_path)
     except Exception as exc:
         _logger.critical(str(exc))
         return None
@@ -258,7 +453,7 @@ def get_active_countries(rules: dict) -> dict:
     for cntry in rules:
 
         if not rules[cntry]["active"]:
-            _logger.warning(f"{cntry} excluded form processing as per settings in country rules.")
+            _logger.warning("%s excluded form processing as per settings in country rules.", cntry)
             continue
 
         cocd = rules[cntry]["company_code"]
@@ -268,8 +463,10 @@ def get_active_countries(rules: dict) -> dict:
         _logger.critical("No active country found!")
         return None
 
-    _logger.info(f"Number of countries to process: {len(countries)}.")
-    _logger.debug(f"Countries: {'; '.join(countries.keys())}.")
+    _logger.info("Number of countries to process: %d.", len(countries))
+
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug("Countries: %s.", "; ".join(countries.keys()))
 
     return countries
 
@@ -296,7 +493,7 @@ def connect_to_sap(sap_cfg: dict) -> CDispatch:
         system = sap.Systems.Q25
 
     _logger.info("Logging to SAP ... ")
-    _logger.debug(f"System: '{system}'")
+    _logger.debug("System: '%s'", system)
 
     try:
         sess = sap.login(sap_cfg["gui_exe_path"], system)
@@ -325,6 +522,33 @@ def disconnect_from_sap(sess: CDispatch):
 
     return sess
 
+@contextmanager
+def sap_session(sap_cfg: dict) -> Iterator[CDispatch]:
+    """
+    Manages the connection to the SAP GUI scripting \n
+    engine for the duration of a 'with' statement.
+
+    Params:
+    -------
+    sap_cfg:
+        Application 'sap' configuration params.
+
+    Returns:
+    --------
+    A SAP GuiSession object that gets disconnected \n
+    on exiting the 'with' statement. If the attempt \n
+    to connect to the scripting engine fails due \n
+    to an error, then None is returned.
+    """
+
+    sess = connect_to_sap(sap_cfg)
+
+    try:
+        yield sess
+    finally:
+        if sess is not None:
+            disconnect_from_sap(sess)
+
 def save_states(file_path: str, new_vals: dict = None):
     """
     Saves application runtime processig states to a file.
@@ -350,17 +574,27 @@ def save_states(file_path: str, new_vals: dict = None):
     if new_vals is None:
         new_vals = {"last_run": get_current_date(fmt = "")}
 
-    with open(file_path, 'r', encoding = "utf-8") as stream:
-        states = json.load(stream)
+    states = _load_json(file_path)
 
     for key in new_vals:
         states[key] = new_vals[key]
 
-    with open(file_path, 'w', encoding = "utf-8") as stream:
-        json.dump(states, stream, indent = 4)
+    _dump_json(states, file_path)
+
+def _get_fbl5n_paths(data_cfg: dict) -> tuple:
+    """
+    Returns paths to the files with \n
+    cleared and open FBL5N items.
+    """
+
+    exp_name = data_cfg["fbl5n_export_name"]
+    clr_exp_path = join(data_cfg["export_dir"], exp_name.replace("$type$", "cleared"))
+    opn_exp_path = join(data_cfg["export_dir"], exp_name.replace("$type$", "open"))
+
+    return (clr_exp_path, opn_exp_path)
 
-def export_fbl5n_data(data_cfg: dict, sap_cfg: dict, stat_cfg: dict,
-                      countries: dict, sess: CDispatch) -> bool:
+def export_fbl5n_data(data_cfg: dict, sap_cfg: dict, stat_cfg: dict, countries: dict,
+                      sess: CDispatch, on_exported: Callable[[str], None] = None) -> bool:
     """
     Manages data export from customer accounts into a local file.
 
@@ -381,20 +615,27 @@ def export_fbl5n_data(data_cfg: dict, sap_cfg: dict, stat_cfg: dict,
     sess:
         A SAP GuiSession object.
 
+    on_exported:
+        A callable that is passed the path to each exported \n
+        file as soon as the file is available. If None is used, \n
+        (default value), then no callback is made.
+
     Returns:
     --------
     True if data export succeeds, False if it fails.
     """
 
+    if on_exported is None:
+        on_exported = lambda exp_path: None
+
     _logger.info("Starting FBL5N ...")
     fbl5n.start(sess)
 
-    exp_path = join(data_cfg["export_dir"], data_cfg["fbl5n_export_name"])
-    clr_exp_path = exp_path.replace("$type$", "cleared")
-    opn_exp_path = exp_path.replace("$type$", "open")
+    clr_exp_path, opn_exp_path = _get_fbl5n_paths(data_cfg)
 
     if exists(clr_exp_path):
         _logger.warning("Data for cleared items already exported from FBL5N in the previous run.")
+        on_exported(clr_exp_path)
     else:
         _logger.info("Exporting cleared items from FBL5N ...")
 
@@ -414,9 +655,12 @@ def export_fbl5n_data(data_cfg: dict, sap_cfg: dict, stat_cfg: dict,
             _logger.info("Closing FBL5N ...")
             fbl5n.close()
             return False
+        else:
+            on_exported(clr_exp_path)
 
     if exists(opn_exp_path):
         _logger.warning("Data for open items already exported from FBL5N in the previous run.")
+        on_exported(opn_exp_path)
     else:
         _logger.info("Exporting open items from FBL5N ...")
         try:
@@ -435,12 +679,72 @@ def export_fbl5n_data(data_cfg: dict, sap_cfg: dict, stat_cfg: dict,
             _logger.info("Closing FBL5N ...")
             fbl5n.close()
             return False
+        else:
+            on_exported(opn_exp_path)
 
     _logger.info("Closing FBL5N ...")
     fbl5n.close()
 
     return True
 
+def export_and_preprocess_fbl5n_data(data_cfg: dict, sap_cfg: dict, stat_cfg: dict,
+                                     rules: dict, countries: dict, sess: CDispatch) -> tuple:
+    """
+    Manages data export from customer accounts and preprocessing \n
+    of the exported data. Each exported file is converted in a \n
+    background thread while FBL5N keeps exporting the next one.
+
+    Params:
+    -------
+    data_cfg:
+        Application 'data' configuration parameters.
+
+    sap_cfg:
+        Application 'sap' configuration parameters.
+
+    stat_cfg:
+        Application 'states' configuration parameters.
+
+    rules:
+        Data processing rules for particular countries.
+
+    countries:
+        List of countries for which data will be exported and preprocessed.
+
+    sess:
+        A SAP GuiSession object.
+
+    Returns:
+    --------
+    A tuple of the export result and the preprocessed data. \n
+    The export result is True if data export succeeds, False \n
+    if it fails. The data is None if data export or conversion fails.
+    """
+
+    # the SAP GUI scripting engine runs on the calling
+    # thread, the worker only parses the exported files
+    with ThreadPoolExecutor(max_workers = 1) as executor:
+
+        conversions = []
+
+        def convert(exp_path: str):
+            _logger.info("Converting exported FBL5N data: '%s' ...", exp_path)
+            conversions.append(executor.submit(proc.convert_fbl5n_data, [exp_path]))
+
+        exported = export_fbl5n_data(data_cfg, sap_cfg, stat_cfg, countries, sess, convert)
+
+        if not exported:
+            for conversion in conversions:
+                conversion.cancel()
+            return (False, None)
+
+        converted = proc.concat_fbl5n_data([conv.result() for conv in conversions])
+
+    if converted is None:
+        return (True, None)
+
+    return (True, _assign_cases_and_countries(converted, rules, countries))
+
 def export_dms_data(data_cfg: dict, sap_cfg: str, fbl5n_data: DataFrame, sess: CDispatch) -> bool:
     """
     Manages data export from DMS into a local data file.
@@ -470,8 +774,7 @@ def export_dms_data(data_cfg: dict, sap_cfg: str, fbl5n_data: DataFrame, sess: C
         _logger.warning("DMS data already exported in the previous application run.")
         return True
 
-    subset = fbl5n_data.query("Case_ID.notna()")
-    cases = tuple(subset["Case_ID"].unique())
+    cases = tuple(fbl5n_data["Case_ID"].dropna().unique())
     n_total = len(cases)
 
     _logger.info("Starting DMS ...")
@@ -484,7 +787,7 @@ def export_dms_data(data_cfg: dict, sap_cfg: str, fbl5n_data: DataFrame, sess: C
         return False
 
     if n_found < n_total:
-        _logger.warning(f"Incorrect disputes detected: {n_total - n_found}")
+        _logger.warning("Incorrect disputes detected: %d", n_total - n_found)
 
     _logger.info("Exporting DMS data ...")
 
@@ -501,46 +804,14 @@ def export_dms_data(data_cfg: dict, sap_cfg: str, fbl5n_data: DataFrame, sess: C
 
     return exported
 
-def preprocess_fbl5n_data(data_cfg: dict, rules: dict, countries: dict) -> dict:
+def _assign_cases_and_countries(converted: DataFrame, rules: dict, countries: dict) -> DataFrame:
     """
-    Manages preprocessing of exported FBL5N data.
-
-    Params:
-    -------
-    data_cfg:
-        Application 'data' configuration parameters.
-
-    rules:
-        Data processing rules for particular countries.
-
-    countries:
-        List of countries for which accounting data will be preprocessed.
-
-    Returns:
-    --------
-    A dict of preprocessed FBL5N data per company code. \n
-    If conversion fails due to an error, then None is returned.
+    Extracts case ID numbers from the converted \n
+    FBL5N data and assigns countries to the data. \n
+    Returns None if no data of the processed \n
+    company codes is found.
     """
 
-    clr_exp_name = data_cfg["fbl5n_export_name"].replace("$type$", "cleared")
-    opn_exp_name = data_cfg["fbl5n_export_name"].replace("$type$", "open")
-    clr_exp_path = join(data_cfg["export_dir"], clr_exp_name)
-    opn_exp_path = join(data_cfg["export_dir"], opn_exp_name)
-
-    exp_paths = []
-
-    if exists(clr_exp_path):
-        exp_paths.append(clr_exp_path)
-
-    if exists(opn_exp_path):
-        exp_paths.append(opn_exp_path)
-
-    _logger.info("Converting exported FBL5N data ...")
-    converted = proc.convert_fbl5n_data(exp_paths)
-
-    if converted is None:
-        return None
-
     cocd_to_rx = {}
     cocd_to_cntry = {}
 
@@ -549,8 +820,16 @@ def preprocess_fbl5n_data(data_cfg: dict, rules: dict, countries: dict) -> dict:
         cocd_to_rx[cocd] = rules[cntry]["case_rx"]
         cocd_to_cntry[cocd] = cntry
 
+    # data exported in a previous run may contain items
+    # of company codes that are no longer to be processed
+    subset = converted[converted["Company_Code"].isin(frozenset(cocd_to_cntry))]
+
+    if subset.empty:
+        _logger.error("Exported FBL5N data contains no items of the processed company codes!")
+        return None
+
     _logger.info("Extracting case ID numbers from data ...")
-    extracted = proc.extract_cases(converted, cocd_to_rx)
+    extracted = proc.extract_cases(subset, cocd_to_rx)
 
     _logger.info("Assigning countries to data ...")
     assigned = proc.assign_country(extracted, cocd_to_cntry)
@@ -608,17 +887,12 @@ def process_data(fbl5n_data: DataFrame, dms_data: DataFrame, countries: list, ru
 
     compacted = proc.compact_data(fbl5n_data, dms_data)
     checked = proc.check_consistency(compacted)
-    search_results = []
-
-    for cntry in countries:
-        _logger.info(f"Searching cases to process for {cntry} ...")
-        search_res = proc.search_matches(checked, rules[cntry])
-        search_results.append(search_res)
 
-    concatenated = concat(search_results)
-    closing_input = proc.create_closing_input(concatenated)
+    _logger.info("Searching cases to process for %s ...", "; ".join(countries))
+    evaluated = proc.search_matches(checked, {cntry: rules[cntry] for cntry in countries})
+    closing_input = proc.create_closing_input(evaluated)
 
-    return (closing_input, concatenated)
+    return (closing_input, evaluated)
 
 def check_output(cfg_data: dict) -> DataFrame:
     """
@@ -656,16 +930,7 @@ def _get_new_status(prev_val: int) -> dms.CaseStates:
     integer to a dms.CaseStates enumerated value.
     """
 
-    if prev_val is None:
-        new_val = dms.CaseStates.Original
-    elif prev_val == 2:
-        new_val = dms.CaseStates.Solved
-    elif prev_val == 3:
-        new_val = dms.CaseStates.Closed
-    else:
-        assert False, "The used status is not valid for DMS closing!"
-
-    return new_val
+    return _new_states[prev_val]
 
 def _get_new_root_cause(prev_val: str) -> dms.RootCauses:
     """
@@ -673,21 +938,12 @@ def _get_new_root_cause(prev_val: str) -> dms.RootCauses:
     string to a dms.RootCauses enumerated value.
     """
 
-    if prev_val is None:
-        new_val = None
-    elif prev_val == "L06":
-        new_val = dms.RootCauses.CREDITNOTE_ISSUED
-    elif prev_val == "L01":
-        new_val = dms.RootCauses.PAYMENT_AGREMENT
-    else:
-        assert False, "The used root cause is not valid for DMS closing!"
-
-    return new_val
+    return _new_root_causes[prev_val]
 
 def process_disputes(closing_input: list, compacted: DataFrame, sess: CDispatch) -> DataFrame:
     """
     Modifies DMS cases with new parameters, changes case state where applicable \n
-    and writes the DMS processing output message into a copy of the original data \n
+    and writes the DMS processing output message into the original data \n
     for each processed case.
 
     Params:
@@ -696,7 +952,8 @@ def process_disputes(closing_input: list, compacted: DataFrame, sess: CDispatch)
         Input data for DMS processing (closing).
 
     compacted:
-        The original compacted data.
+        The original compacted data. \n
+        The data is updated in place.
 
     sess:
         A SAP GuiSession object.
@@ -707,7 +964,7 @@ def process_disputes(closing_input: list, compacted: DataFrame, sess: CDispatch)
     If the processing fails due to an error, then None is returned.
     """
 
-    output = compacted.copy()
+    output = compacted
 
     _logger.info("Starting DMS ...")
     srch_mask = dms.start(sess)
@@ -715,37 +972,63 @@ def process_disputes(closing_input: list, compacted: DataFrame, sess: CDispatch)
     if srch_mask is None:
         return None
 
+    # error messages of the failed cases get collected
+    # first and written to the output rows in one go
+    failed = {}
+    n_cases = len(closing_input)
+
     for counter, rec in enumerate(closing_input, start = 1):
 
         case_id = rec.CaseID
-        new_root_cause = rec.RootCause
         new_status_sales = rec.StatusSales
 
-        _logger.info(f"Processing case: {case_id} ({counter} of {len(closing_input)}) ...")
+        _logger.info("Processing case: %s (%d of %d) ...", case_id, counter, n_cases)
         new_status = _get_new_status(rec.Status)
         new_root_cause = _get_new_root_cause(rec.RootCause)
 
         try:
             grid_view = dms.search_dispute(srch_mask, case_id)
         except Exception as exc:
-            output.loc[output[output["Case_ID"] == case_id].index, "IsError"] = True
-            output.loc[output["Case_ID"] == case_id, "Message"] = f"Case unprocessed. Error: {exc}"
-            _logger.error(f" Processing failed. Reason: {exc}")
+            failed[case_id] = f"Case unprocessed. Error: {exc}"
+            _logger.error(" Processing failed. Reason: %s", exc)
             continue
 
         try:
             dms.modify_case_parameters(grid_view, new_root_cause, new_status_sales, new_status)
         except Exception as exc:
-            output.loc[output[output["Case_ID"] == case_id].index, "IsError"] = True
-            output.loc[output["Case_ID"] == case_id, "Message"] = f"Case unprocessed. Error: {exc}"
-            _logger.error(f" Case unprocessed. Error: {exc}")
+            failed[case_id] = f"Case unprocessed. Error: {exc}"
+            _logger.error(" Case unprocessed. Error: %s", exc)
             continue
 
     _logger.info("Closing DMS ...")
     dms.close()
 
+    if len(failed) != 0:
+        errors = output["Case_ID"].isin(failed.keys())
+        output.loc[errors, "IsError"] = True
+        output.loc[errors, "Message"] = output.loc[errors, "Case_ID"].map(failed)
+
     return output
 
+def _build_report(data: DataFrame, cntry: str, cocd: str, report_cfg: dict) -> str:
+    """
+    Creates user report for a country and returns its processing \n
+    summary table row. Called in a worker thread, so any errors \n
+    are raised to be logged by the calling thread.
+    """
+
+    file_name = report_cfg["report_name"].replace("$country$", cntry)
+    file_name = file_name.replace("$company_code$", cocd)
+    loc_file_path = join(report_cfg["local_report_dir"], file_name)
+
+    rep.create_report(data,
+        loc_file_path,
+        report_cfg["sheet_name"],
+        report_cfg["field_order"]
+    )
+
+    return rep.summarize(data, cocd, cntry)
+
 def _create_reports(data: DataFrame, report_cfg: dict, notif_cfg: dict, countries: dict) -> bool:
     """
     Manages creation of user reports.
@@ -771,37 +1054,29 @@ def _create_reports(data: DataFrame, report_cfg: dict, notif_cfg: dict, countrie
 
     _logger.info("Creating user reports ...")
 
-    summ = ""
-    success = False
+    tbl_rows = []
+    builds = {}
 
-    for cntry in countries:
-
-        _logger.info(f" Creating report and processing summary for {cntry} ...")
+    # the reports are independent of each other, so these are written
+    # in threads, which overlap the file writes to the report folder
+    with ThreadPoolExecutor(max_workers = min(8, len(countries))) as executor:
 
-        cocd = countries[cntry]
-        subset = data[data["Company_Code"] == cocd]
-        file_name = report_cfg["report_name"].replace("$country$", cntry)
-        file_name = file_name.replace("$company_code$", cocd)
-        loc_file_path = join(report_cfg["local_report_dir"], file_name)
+        for cntry, cocd in countries.items():
+            _logger.info(" Creating report and processing summary for %s ...", cntry)
+            subset = data[data["Company_Code"] == cocd]
+            builds[cntry] = executor.submit(_build_report, subset, cntry, cocd, report_cfg)
 
-        try:
-            rep.create_report(subset,
-                loc_file_path,
-                report_cfg["sheet_name"],
-                report_cfg["field_order"]
-            )
-        except Exception as exc:
-            _logger.error("Could not create report!", exc_info = exc)
-            continue
-
-        tbl_row = rep.summarize(subset, cocd, cntry)
-        summ = "".join([summ, tbl_row]) # add the row to the existing summary
-        success = True
+        for cntry, build in builds.items():
+            try:
+                tbl_rows.append(build.result())
+            except Exception as exc:
+                _logger.error("Could not create report for %s!", cntry, exc_info = exc)
 
-    if not success:
+    if len(tbl_rows) == 0:
         return False
 
     summary_path = join(notif_cfg["notification_dir"], notif_cfg["summary_name"])
+    summ = "".join(tbl_rows)
     assert summ != "", "Summary is empty!"
 
     try:
@@ -813,7 +1088,7 @@ def _create_reports(data: DataFrame, report_cfg: dict, notif_cfg: dict, countrie
 
     return True
 
-def _create_notification(notif_cfg: dict, report_cfg: dict) -> bool:
+def _create_notification(notif_cfg: dict, report_cfg: dict, net_subdir: str) -> bool:
     """
     Manages creation of user notifications.
 
@@ -822,12 +1097,12 @@ def _create_notification(notif_cfg: dict, report_cfg: dict) -> bool:
     notif_cfg:
         Application 'notifications' configuration params.
 
-    data_cfg:
-        Application 'data' configuration params.
-
     report_cfg:
         Application 'reports' configuration params.
 
+    net_subdir:
+        Name of the network folder subdirectory containing the reports.
+
     Returns:
     --------
     True, if the notification creation succeeds, False if it fails.
@@ -849,7 +1124,7 @@ def _create_notification(notif_cfg: dict, report_cfg: dict) -> bool:
             notification_path = join(notif_cfg["notification_dir"], notif_cfg["notification_name"]),
             template_path = notif_cfg["template_path"],
             net_dir = report_cfg["net_report_dir"],
-            net_subdir = get_current_date(report_cfg["net_report_subdir_format"]),
+            net_subdir = net_subdir,
             summary = summ
         )
     except Exception as exc:
@@ -883,39 +1158,40 @@ def _upload_reports(src_dir: str, dst_dir: str, dst_subdir: str) -> bool:
 
     _logger.info("Uploading reports ...")
 
+    dst_path = join(dst_dir, dst_subdir)
+
     for rep_path in glob(join(src_dir, "*.xlsx")):
 
         rep_name = split(rep_path)[1]
-
-        # compile paths
-        dst_path = join(dst_dir, dst_subdir)
         dst_file_path = join(dst_path, rep_name)
-        _logger.info(f" Moving file: {rep_path} -> {dst_file_path} ...")
+        _logger.info(" Moving file: %s -> %s ...", rep_path, dst_file_path)
 
-        # check if the destination folder exists,
-        # create new subdir in the folder if not
-        if not exists(dst_path):
-            try:
-                mkdir(dst_path)
-            except FileExistsError:
-                _logger.error("Could not upload reports. "
-                f"Reason: Missing access to destination folder '{dst_dir}'.")
-                return False
-            except Exception as exc:
-                _logger.error("Could not create report directory "
-                             f"in destination folder. Reason: {exc}.")
-                return False
-
-        # upload report to the dst folder
+        # create new subdir in the destination folder if it doesn't exist yet
         try:
-            move(rep_path, dst_file_path)
+            makedirs(dst_path, exist_ok = True)
+        except FileExistsError:
+            _logger.error("Could not upload reports. "
+            "Reason: Missing access to destination folder '%s'.", dst_dir)
+            return False
         except Exception as exc:
-            _logger.error(f"Moving failed. Reason: {exc}")
+            _logger.error("Could not create report directory "
+                         "in destination folder. Reason: %s.", exc)
             return False
 
+        # upload report to the dst folder, a rename within the same
+        # volume is tried first, then the file is copied across volumes
+        try:
+            replace(rep_path, dst_file_path)
+        except OSError:
+            try:
+                move(rep_path, dst_file_path)
+            except Exception as exc:
+                _logger.error("Moving failed. Reason: %s", exc)
+                return False
+
     return True
 
-def _notify_users(notif_cfg: dict, countries: dict) -> bool:
+def _notify_users(notif_cfg: dict, countries: dict, day: date) -> bool:
     """
     Manages seding of email notifications to users.
 
@@ -928,6 +1204,9 @@ def _notify_users(notif_cfg: dict, countries: dict) -> bool:
         Countries and their company codes for which the \n
         reports will be created.
 
+    day:
+        Date of the notification.
+
     Returns:
     --------
     True if sending of the notification succeeds, False if it fails.
@@ -935,12 +1214,14 @@ def _notify_users(notif_cfg: dict, countries: dict) -> bool:
 
     _logger.info("Sending notification to users ...")
 
-    subject = notif_cfg["subject"].replace("$date$" , get_current_date("%d-%b-%Y"))
+    subject = notif_cfg["subject"].replace("$date$" , day.strftime("%d-%b-%Y"))
     recips = []
+    listed = set()
 
     for usr in notif_cfg["recipients"]:
-        if usr["mail"] not in recips and (usr["country"] in countries or usr["country"] == "All"):
+        if usr["mail"] not in listed and (usr["country"] in countries or usr["country"] == "All"):
             recips.append(usr["mail"])
+            listed.add(usr["mail"])
 
     notif_path = join(notif_cfg["notification_dir"], notif_cfg["notification_name"])
 
@@ -959,6 +1240,8 @@ def _notify_users(notif_cfg: dict, countries: dict) -> bool:
     except Exception as exc:
         _logger.exception(exc)
         return False
+    finally:
+        mail.close_smtp()
 
     return True
 
@@ -990,10 +1273,14 @@ def report_output(countries: dict, data: DataFrame,
     if not _create_reports(data, report_cfg, notif_cfg, countries):
         return False
 
+    # all reporting steps refer to the same date
+    today = get_current_date()
+    net_subdir = today.strftime(report_cfg["net_report_subdir_format"])
+
     uploaded = _upload_reports(
         src_dir = report_cfg["local_report_dir"],
         dst_dir = report_cfg["net_report_dir"],
-        dst_subdir = get_current_date(report_cfg["net_report_subdir_format"])
+        dst_subdir = net_subdir
     )
 
     if not uploaded:
@@ -1003,14 +1290,38 @@ def report_output(countries: dict, data: DataFrame,
         _logger.warning("Sending notification to users turned off in 'appconfig.yaml'.")
     else:
 
-        if not _create_notification(notif_cfg, report_cfg):
+        if not _create_notification(notif_cfg, report_cfg, net_subdir):
             return False
 
-        if not _notify_users(notif_cfg, countries):
+        if not _notify_users(notif_cfg, countries, today):
             return False
 
     return True
 
+def _iter_files(dir_path: str) -> Iterator[str]:
+    """
+    Yields paths to all files contained \n
+    in a folder and its subfolders.
+    """
+
+    with scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks = False):
+                yield from _iter_files(entry.path)
+            elif entry.is_file(follow_symlinks = False):
+                yield entry.path
+
+def _remove_file(file_path: str):
+    """
+    Deletes a file. If the deletion
+    fails, then the error is logged.
+    """
+
+    try:
+        remove(file_path)
+    except Exception as exc:
+        _logger.exception(exc)
+
 def remove_temp_files(dir_path: str):
     """
     Deletes all files contained
@@ -1027,16 +1338,17 @@ def remove_temp_files(dir_path: str):
     None.
     """
 
-    file_paths = glob(join(dir_path, "**", "*.*"), recursive = True)
+    file_paths = _iter_files(dir_path)
 
-    if len(file_paths) == 0:
+    try:
+        first_path = next(file_paths)
+    except (StopIteration, FileNotFoundError):
         _logger.warning("No temporary files found!")
         return
 
     _logger.info("Deleting temporaty data ...")
 
-    for file_path in file_paths:
-        try:
-            remove(file_path)
-        except Exception as exc:
-            _logger.exception(exc)
+    # the files are deleted in parallel to hide
+    # the per-file latency of network or temp drives
+    with ThreadPoolExecutor(max_workers = 16) as executor:
+        executor.map(_remove_file, chain([first_path], file_paths))
@@ -15,10 +15,11 @@ Version history:
 """
 
 from enum import Enum, IntEnum
-import logging
 from os.path import exists, isfile, split
-from pyperclip import copy as copy_to_clipboard
+import re
 from win32com.client import CDispatch
+import win32clipboard
+import win32con
 
 class CaseCountError(Exception):
     """
@@ -85,322 +86,603 @@ class _SearchFieldIndexes(IntEnum):
     RestrictHitsTo = 23
 
 
-_sess = None
-_main_wnd = None
-_stat_bar = None
-
 # keyboard to SAP virtual keys mapping
-_vkeys = {
-    "Enter":    0,
-    "F3":       3,
-    "F8":       8,
-    "CtrlS":    11,
-    "F12":      12,
-    "ShiftF4":  16,
-    "ShiftF12": 24
-}
+_VK_ENTER = 0
+_VK_F3 = 3
+_VK_F8 = 8
+_VK_CTRLS = 11
+_VK_F12 = 12
+_VK_SHIFTF4 = 16
+_VK_SHIFTF12 = 24
+
+# 'Status' values as displayed in the case parameter mask
+_OPEN = "Open"
+_SOLVED = "Solved"
+_CLOSED = "Closed"
 
 _status_map = {
-    CaseStates.Open: "Open",
-    CaseStates.Solved: "Solved",
-    CaseStates.Closed: "Closed",
+    CaseStates.Open: _OPEN,
+    CaseStates.Solved: _SOLVED,
+    CaseStates.Closed: _CLOSED,
 }
 
-_logger = logging.getLogger("master")
+# rows of the layouts found in the DMS layout list by name
+_layout_rows = {}
+
+# steps of changing the case 'Status' from one value to another,
+# each step represented by the value entered and whether the value
+# must be saved before the next step, since DMS doesn't allow to
+# change an open case to closed and vice versa directly
+_status_transitions = {
+    (_OPEN, _SOLVED): ((_SOLVED, False),),
+    (_OPEN, _CLOSED): ((_SOLVED, True), (_CLOSED, False)),
+    (_SOLVED, _OPEN): ((_OPEN, False),),
+    (_SOLVED, _CLOSED): ((_CLOSED, False),),
+    (_CLOSED, _SOLVED): ((_SOLVED, False),),
+    (_CLOSED, _OPEN): ((_SOLVED, True), (_OPEN, False))
+}
 
-def _is_error_message(sbar: CDispatch) -> bool:
-    """
-    Checks if a status bar message
-    is an error message.
-    """
+# option list of the data export format dialog
+_FORMAT_OPTIONS_ID = "wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150"
 
-    if sbar.messageType == "E":
-        return True
+# ID of the DMS menu tree node opening the case search mask
+_SEARCH_NODE = "4"
 
-    return False
+# leading number of a status bar message reporting the search
+# result count, such as '1.234 disputes found', thousands separated
+_NFOUND_RE = re.compile(r"\s*([\d.]+)")
 
-def _is_popup_dialog() -> bool:
+def _find_node(tree: CDispatch, node: str, node_id: str) -> str:
     """
-    Checks if the active window
-    is a popup dialog window.
+    Traverses the left-sided DMS menu tree recursively to find the item
+    with the given node ID. Returns the key of the found node or None
+    if the item is not found in the tree.
     """
 
-    if _sess.ActiveWindow.type == "GuiModalWindow":
-        return True
+    if node.strip() == node_id:
+        return node
 
-    return False
+    # subnodes of a folder get loaded once the folder is expanded
+    if tree.IsFolder(node):
+        tree.ExpandNode(node)
 
-def _close_popup_dialog(confirm: bool):
-    """
-    Confirms or delines a pop-up dialog.
-    """
+    subnodes = tree.GetsubnodesCol(node)
 
-    if _sess.ActiveWindow.text == "Information":
-        if confirm:
-            _main_wnd.SendVKey(_vkeys["Enter"]) # confirm
-        else:
-            _main_wnd.SendVKey(_vkeys["F12"])   # decline
-        return
+    if subnodes is None:
+        return None
 
-    btn_caption = "Yes" if confirm else "No"
+    for subnode in subnodes:
+        found = _find_node(tree, subnode, node_id)
+        if found is not None:
+            return found
 
-    for child in _sess.ActiveWindow.Children:
-        for grandchild in child.Children:
-            if grandchild.Type != "GuiButton":
-                continue
-            if btn_caption != grandchild.text.strip():
-                continue
-            grandchild.Press()
-            return
+    return None
 
-def _get_grid_view() -> CDispatch:
+def _change_case_param(param_mask: CDispatch, cell_idx: int, col_type: str, val: str):
     """
-    Returns a GuiGridView object representing
-    the DMS window containing search results.
+    Changes the value of an editable case parameter field identified
+    in the case parameter grid by the cell index and column type.
     """
 
-    splitter_shell = _main_wnd.FindByName("shell", "GuiSplitterShell")
-    grid_view = splitter_shell.FindAllByName("shell", "GuiGridView")(6)
-
-    return grid_view
+    param_mask.ModifyCell(cell_idx, col_type, val)
 
-def _get_param_mask() -> CDispatch:
+def _get_case_param(param_mask: CDispatch, cell_idx: int, col_type: str) -> str:
     """
-    Returns a GuiGridView object representing
-    the DMS case parameter mask containing editable fields.
+    Returns the value of an editable case parameter field identified
+    in the case parameter grid by the cell index and column type.
     """
 
-    splitter_shell = _main_wnd.FindByName("shell", "GuiSplitterShell")
-    param_mask = splitter_shell.FindAllByName("shell", "GuiGridView")(5)
+    cell_val = param_mask.GetCellValue(cell_idx, col_type)
+
+    return cell_val
+
+def _get_nfound(msg: str) -> int:
+
+    match = _NFOUND_RE.match(msg)
 
-    return param_mask
+    if match is None:
+        return 0
 
-def _execute_query():
+    return int(match.group(1).replace(".", ""))
+
+def _set_case(search_mask, case: int):
+    search_mask.ModifyCell(_SearchFieldIndexes.CaseID, "VALUE1", str(case))
+
+def _set_hitlimit(search_mask, n_cases):
+    search_mask.ModifyCell(_SearchFieldIndexes.RestrictHitsTo, "VALUE1", n_cases)
+
+def _validate_case_parameters(root_cause: RootCauses, status_sales: str, status: CaseStates):
     """
-    Simulates pressing the 'Search' button
-    located on the DMS main search mask.
+    Checks the types and values of new case parameters.
     """
 
-    splitter_shell = _main_wnd.FindByName("shell", "GuiSplitterShell")
-    qry_toolbar = splitter_shell.FindAllByName("shell", "GuiToolbarControl")(5)
-    qry_toolbar.PressButton("DO_QUERY")
+    if not (root_cause is None or isinstance(root_cause, RootCauses)):
+        raise TypeError(f"Argument 'root_cause' has incorrect type: {type(root_cause)}")
 
-def _find_and_click_node(tree: CDispatch, node: CDispatch, node_id: str) -> bool:
+    if not (status is None or isinstance(status, CaseStates)):
+        raise TypeError(f"Argument 'status' has incorrect type: {type(status)}")
+
+    MAX_FIELD_CHARS = 40
+
+    if status_sales is not None and len(status_sales) > MAX_FIELD_CHARS:
+        ValueError("The limit of 50 characters for 'Status Sales' exceeded!")
+
+class DMSSession:
     """
-    Traverses the left-sided DMS menu tree to find the item with the given node ID.
-    Once the item is found, the procedure simulates clicking on that item to open
-    the corresponding subwindow.
+    A running UDM_DISPUTE transaction bound to a SAP GuiSession. \n
+    Each instance keeps its own session state, so that separate \n
+    SAP connections can process disputes in parallel.
     """
 
-    # find and double click the target root node
-    if tree.IsFolder(node):
-        tree.CollapseNode(node)
-        tree.ExpandNode(node)
+    def __init__(self, sess: CDispatch):
+        """
+        Params:
+        -------
+        sess:
+            A GuiSession object.
+        """
+
+        self.sess = sess
+        self.main_wnd = sess.findById("wnd[0]")
+        self.stat_bar = self.main_wnd.findById("sbar")
+
+        # GUI controls of the transaction screen that remain
+        # valid until the transaction is closed, see _get_toolbar()
+        self._cache = {}
+
+    def _snapshot_sbar(self) -> tuple:
+        """
+        Returns the text and the type
+        of the status bar message.
+        """
+
+        return (self.stat_bar.Text, self.stat_bar.messageType)
+
+    def _is_popup_dialog(self) -> bool:
+        """
+        Checks if the active window
+        is a popup dialog window.
+        """
+
+        return self.sess.ActiveWindow.type == "GuiModalWindow"
+
+    def _close_popup_dialog(self, confirm: bool):
+        """
+        Confirms or delines a pop-up dialog.
+        """
+
+        if self.sess.ActiveWindow.text == "Information":
+            if confirm:
+                self.main_wnd.SendVKey(_VK_ENTER) # confirm
+            else:
+                self.main_wnd.SendVKey(_VK_F12)   # decline
+            return
+
+        btn_caption = "Yes" if confirm else "No"
+
+        for child in self.sess.ActiveWindow.Children:
+            for grandchild in child.Children:
+                if grandchild.Type != "GuiButton":
+                    continue
+                if btn_caption != grandchild.text.strip():
+                    continue
+                grandchild.Press()
+                return
+
+    def _get_splitter_shell(self) -> CDispatch:
+        """
+        Returns the GuiSplitterShell object containing
+        all DMS subwindows. The object is looked up once
+        per transaction run.
+        """
+
+        if "splitter" not in self._cache:
+            self._cache["splitter"] = self.main_wnd.FindByName("shell", "GuiSplitterShell")
+
+        return self._cache["splitter"]
+
+    def _get_toolbar(self, idx: int) -> CDispatch:
+        """
+        Returns a GuiToolbarControl object located in
+        the DMS window by its index. The object is looked
+        up once per transaction run.
+        """
+
+        key = ("toolbar", idx)
+
+        if key not in self._cache:
+            self._cache[key] = self._get_splitter_shell().FindAllByName(
+                "shell", "GuiToolbarControl")(idx)
+
+        return self._cache[key]
+
+    def _get_grid_view(self) -> CDispatch:
+        """
+        Returns a GuiGridView object representing
+        the DMS window containing search results.
+        """
+
+        grid_view = self._get_splitter_shell().FindAllByName("shell", "GuiGridView")(6)
+
+        return grid_view
+
+    def _get_param_mask(self) -> CDispatch:
+        """
+        Returns a GuiGridView object representing
+        the DMS case parameter mask containing editable fields.
+        """
+
+        param_mask = self._get_splitter_shell().FindAllByName("shell", "GuiGridView")(5)
+
+        return param_mask
+
+    def _execute_query(self):
+        """
+        Simulates pressing the 'Search' button
+        located on the DMS main search mask.
+        """
+
+        self._get_toolbar(5).PressButton("DO_QUERY")
+
+    def _get_search_mask(self) -> CDispatch:
+        """
+        Returns the GuiGridView object representing
+        the DMS case search window.
+        """
+
+        tree = self.main_wnd.findById(
+            "shellcont/shell/shellcont[0]/shell/shellcont[1]/shell/shellcont[1]/shell"
+        )
+
+        # the search node is usually the tree root or one of its direct
+        # subnodes, which get loaded once the root folder is expanded
+        root = next(iter(tree.GetNodesCol()))
+        node = root
+
+        if node.strip() != _SEARCH_NODE:
+
+            if tree.IsFolder(node):
+                tree.ExpandNode(node)
+
+            subnodes = tree.GetsubnodesCol(node)
+            node = None
+
+            for subnode in (subnodes or ()):
+                if subnode.strip() == _SEARCH_NODE:
+                    node = subnode
+                    break
+
+        # otherwise the search node is looked up in the whole tree
+        if node is None:
+            node = _find_node(tree, root, _SEARCH_NODE)
+
+        assert node is not None, "Target node not found!"
 
-    # double clisk the target node
-    if node.strip() == node_id:
         tree.DoubleClickNode(node)
-        return True
 
-    subnodes = tree.GetsubnodesCol(node)
+        # get reference to the search mask object found
+        srch_mask = self._get_splitter_shell().FindAllByName("shell", "GuiGridView")(4)
 
-    if subnodes is None:
-        return False
+        return srch_mask
 
-    iter_subnodes = iter(subnodes)
+    def _get_control_toolbar(self) -> CDispatch:
+        """
+        Returns GuiToolbarControl object representing the DMS control toolbar
+        located in the transaction upper window.
+        """
 
-    if _find_and_click_node(tree, next(iter_subnodes), node_id):
-        return True
+        return self._get_toolbar(3)
 
-    try:
-        next_node = next(iter_subnodes)
-    except StopIteration:
-        return False
-    else:
-        return _find_and_click_node(tree, next_node, node_id)
+    def _save_changes(self):
+        """
+        Simulates pressing the 'Save' button located
+        in the DMS upper toolbar.
+        """
 
-def _get_search_mask() -> CDispatch:
-    """
-    Returns the GuiGridView object representing
-    the DMS case search window.
-    """
+        self._get_control_toolbar().PressButton("SAVE")
+        msg, msg_type = self._snapshot_sbar()
 
-    # find the target node by traversing the search tree
-    tree = _main_wnd.findById(
-        "shellcont/shell/shellcont[0]/shell/shellcont[1]/shell/shellcont[1]/shell"
-    )
+        if msg_type == "E":
+            return (False, msg)
 
-    nodes = tree.GetNodesCol()
-    iter_nodes = iter(nodes)
-    clicked = _find_and_click_node(tree, next(iter_nodes), node_id = "4")
+        return (True, "")
 
-    assert clicked, "Target node not found!"
+    def _change_case_status(self, param_mask: CDispatch, val: int):
+        """
+        Changes the case 'Status' parameter.
+        """
 
-    # get reference to the search mask object found
-    splitter_shell = _main_wnd.FindByName("shell", "GuiSplitterShell")
-    srch_mask = splitter_shell.FindAllByName("shell", "GuiGridView")(4)
+        prev_val = _get_case_param(param_mask, 0, "VALUE2")
+        new_val = _status_map[val]
 
-    return srch_mask
+        for step_val, save in _status_transitions.get((prev_val, new_val), ()):
 
-def _change_case_param(param_mask: CDispatch, cell_idx: int, col_type: str, val: str):
-    """
-    Changes the value of an editable case parameter field identified
-    in the case parameter grid by the cell index and column type.
-    """
+            _change_case_param(param_mask, 0, "VALUE2", step_val)
 
-    param_mask.ModifyCell(cell_idx, col_type, val)
+            if save:
+                self._save_changes()
 
-def _get_case_param(param_mask: CDispatch, cell_idx: int, col_type: str) -> str:
-    """
-    Returns the value of an editable case parameter field identified
-    in the case parameter grid by the cell index and column type.
-    """
+    def _apply_layout(self, grid_view: CDispatch, name: str):
+        """
+        Searches a layout by name in the DMS layouts list. If the layout is
+        found in the list of available layouts, this gets selected.
+        """
 
-    cell_val = param_mask.GetCellValue(cell_idx, col_type)
+        # Open Change Layout Dialog
+        grid_view.PressToolbarContextButton("&MB_VARIANT")
+        grid_view.SelectContextMenuItem("&LOAD")
+        apo_grid = self.sess.findById("wnd[1]").findAllByName("shell", "GuiShell")(0)
 
-    return cell_val
+        # the row where the layout was found previously is checked first
+        # since the list changes only if a layout is created or deleted
+        row_idx = _layout_rows.get(name)
 
-def _get_control_toolbar() -> CDispatch:
-    """
-    Returns GuiToolbarControl object representing the DMS control toolbar
-    located in the transaction upper window.
-    """
+        if row_idx is None or apo_grid.GetCellValue(row_idx, "VARIANT") != name:
 
-    splitter_shell = _main_wnd.FindByName("shell", "GuiSplitterShell")
-    ctrl_toolbar = splitter_shell.FindAllByName("shell", "GuiToolbarControl")(3)
+            row_idx = None
+            n_rows = apo_grid.RowCount
 
-    return ctrl_toolbar
+            for idx in range(0, n_rows):
+                if apo_grid.GetCellValue(idx, "VARIANT") == name:
+                    row_idx = idx
+                    break
 
-def _save_changes():
-    """
-    Simulates pressing the 'Save' button located
-    in the DMS upper toolbar.
-    """
+            if row_idx is None:
+                raise LayoutNotFoundError(f"Layout not found: {name}")
 
-    _get_control_toolbar().PressButton("SAVE")
+            _layout_rows[name] = row_idx
 
-    err_msg = ""
+        apo_grid.setCurrentCell(str(row_idx), "TEXT")
+        apo_grid.clickCurrentCell()
 
-    if _is_error_message(_stat_bar):
-        err_msg = _stat_bar.Text
-        return (False, err_msg)
+    def _export_to_file(self, grid_view: CDispatch, file_path: str, enc: str = "4120"):
+        """
+        Enters folder path, file name and encoding of the file
+        to which the exported data will be written.
+        """
 
-    return (True, err_msg)
+        if not file_path.endswith(".txt"):
+            raise ValueError(
+                f"Invalid file type: {file_path}. "
+                "Only '.txt' file types are supported."
+            )
 
-def _change_case_status(param_mask: CDispatch, val: int):
-    """
-    Changes the case 'Status' parameter.
-    """
+        folder_path, file_name = split(file_path)
 
-    prev_val = _get_case_param(param_mask, 0, "VALUE2")
-    new_val = _status_map[val]
+        if not exists(folder_path):
+            raise FolderNotFoundError(f"Export folder not found: {folder_path}")
 
-    while prev_val != new_val:
+        grid_view.PressToolbarContextButton("&MB_EXPORT")
+        grid_view.SelectContextMenuItem("&PC")
+        self.sess.FindById(f"{_FORMAT_OPTIONS_ID}/radSPOPLI-SELFLAG[0,0]").Select()
+        self.main_wnd.SendVKey(_VK_ENTER)
 
-        if prev_val == _status_map[CaseStates.Open]:
-            curr_val = _status_map[CaseStates.Solved]
-            _change_case_param(param_mask, 0, "VALUE2", curr_val)
+        # confirming the format selection opens a new dialog
+        dlg_usr = self.sess.FindById("wnd[1]/usr")
+        dlg_usr.FindById("ctxtDY_PATH").text = folder_path
+        dlg_usr.FindById("ctxtDY_FILENAME").text = file_name
+        dlg_usr.FindById("ctxtDY_FILE_ENCODING").text = enc
 
-            if new_val == _status_map[CaseStates.Closed]:
-                _save_changes()
+        self.main_wnd.SendVKey(_VK_CTRLS)  # replace an exiting file
+        self.main_wnd.SendVKey(_VK_F3)     # Load main mask
 
-        elif prev_val == _status_map[CaseStates.Closed]:
-            curr_val = _status_map[CaseStates.Solved]
-            _change_case_param(param_mask, 0, "VALUE2", curr_val)
+        # double check if data export succeeded
+        if not isfile(file_path):
+            raise DataWritingError(f"Failed to export data to file: {file_path}")
 
-            if new_val == _status_map[CaseStates.Open]:
-                _save_changes()
+    def _toggle_display_change(self, activate: bool) -> tuple:
+        """
+        Enables editing of a case.
+        """
 
-        elif prev_val == _status_map[CaseStates.Solved]:
-            curr_val = new_val
-            _change_case_param(param_mask, 0, "VALUE2", curr_val)
+        self._get_control_toolbar().PressButton("TOGGLE_DISPLAY_CHANGE")
 
-        prev_val = curr_val
+        msg, msg_type = self._snapshot_sbar()
 
-def _apply_layout(grid_view: CDispatch, name: str):
-    """
-    Searches a layout by name in the DMS layouts list. If the layout is
-    found in the list of available layouts, this gets selected.
-    """
+        if "display only" in msg:
+            return (False, msg)
 
-    # Open Change Layout Dialog
-    grid_view.PressToolbarContextButton("&MB_VARIANT")
-    grid_view.SelectContextMenuItem("&LOAD")
-    apo_grid = _sess.findById("wnd[1]").findAllByName("shell", "GuiShell")(0)
+        if not activate:
+            self.main_wnd.SendVKey(_VK_F3)
+            msg, msg_type = self._snapshot_sbar()
 
-    for row_idx in range(0, apo_grid.RowCount):
-        if apo_grid.GetCellValue(row_idx, "VARIANT") == name:
-            apo_grid.setCurrentCell(str(row_idx), "TEXT")
-            apo_grid.clickCurrentCell()
-            return
+        # handle alert dialogs for non-editable cases
+        if self._is_popup_dialog():
 
-    raise LayoutNotFoundError(f"Layout not found: {name}")
+            err_msg = self.sess.ActiveWindow.children(1).children(1).text
 
-def _export_to_file(grid_view: CDispatch, file_path: str, enc: str = "4120"):
-    """
-    Enters folder path, file name and encoding of the file
-    to which the exported data will be written.
-    """
+            if err_msg == "Attributes may be overwritten later":
+                self._close_popup_dialog(confirm = True)
+            else:
+                self._close_popup_dialog(confirm = False)
+                self.main_wnd.SendVKey(_VK_F3)
+                return (False, err_msg)
 
-    if not file_path.endswith(".txt"):
-        raise ValueError(
-            f"Invalid file type: {file_path}. "
-            "Only '.txt' file types are supported."
-        )
+        elif msg_type == "E":
+            return (False, msg)
 
-    folder_path, file_name = split(file_path)
+        return (True, "")
 
-    if not exists(folder_path):
-        raise FolderNotFoundError(f"Export folder not found: {folder_path}")
+    def _set_cases(self, search_mask: CDispatch, cases: list):
 
-    grid_view.PressToolbarContextButton("&MB_EXPORT")
-    grid_view.SelectContextMenuItem("&PC")
-    _sess.FindById("wnd[1]").FindAllByName("SPOPLI-SELFLAG", "GuiRadioButton")(0).Select()
-    _main_wnd.SendVKey(_vkeys["Enter"])
+        # case IDs are not sensitive data, hence the
+        # clipboard is not cleared after pasting them
+        payload = "\r\n".join(cases)
 
-    _sess.FindById("wnd[1]").FindByName("DY_PATH", "GuiCTextField").text = folder_path
-    _sess.FindById("wnd[1]").FindByName("DY_FILENAME", "GuiCTextField").text = file_name
-    _sess.FindById("wnd[1]").FindByName("DY_FILE_ENCODING", "GuiCTextField").text = enc
+        search_mask.PressButton(0, "SEL_ICON1")
+        self.main_wnd.SendVKey(_VK_SHIFTF4)     # clear any previous values
 
-    _main_wnd.SendVKey(_vkeys["CtrlS"])  # replace an exiting file
-    _main_wnd.SendVKey(_vkeys["F3"])     # Load main mask
+        # the clipboard must be closed before pasting,
+        # otherwise SAP GUI fails to open it for reading
+        win32clipboard.OpenClipboard()
 
-    # double check if data export succeeded
-    if not isfile(file_path):
-        raise DataWritingError(f"Failed to export data to file: {file_path}")
+        try:
+            win32clipboard.EmptyClipboard()
+            win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, payload)
+        finally:
+            win32clipboard.CloseClipboard()
 
-def _toggle_display_change(activate: bool) -> tuple:
-    """
-    Enables editing of a case.
-    """
+        self.main_wnd.SendVKey(_VK_SHIFTF12)    # confirm selection
+        self.main_wnd.SendVKey(_VK_F8)          # confirm
+
+    def _modify_case(self, grid_view: CDispatch, root_cause: RootCauses,
+                     status_sales: str, status: CaseStates):
+        """
+        Opens details of the case selected in the search result list, \n
+        changes the case parameters, saves the changes and returns \n
+        back to the search result list.
+        """
+
+        # open case details
+        grid_view.DoubleClickCurrentCell()
+
+        # enter edit mode
+        activated, err_msg = self._toggle_display_change(activate = True)
+
+        if not activated:
+            self.main_wnd.SendVKey(_VK_F3)
+            raise CaseEditingError(err_msg)
+
+        param_mask = self._get_param_mask()
+
+        # the parameters are changed in the order in which DMS
+        # expects them, the status change may save the case
+        # between two steps, before the status sales is changed
+        if root_cause is not None:
+            _change_case_param(param_mask, 10, "VALUE2", root_cause.value)
+
+        if status != CaseStates.Original:
+            self._change_case_status(param_mask, status.value)
+
+        if status_sales is not None:
+            _change_case_param(param_mask, 11, "VALUE1", status_sales)
+
+        saved, saving_msg = self._save_changes()
+
+        if not saved:
+            self.main_wnd.SendVKey(_VK_F3)
+            if self._is_popup_dialog():
+                self._close_popup_dialog(confirm = False)
+            raise CaseEditingError(saving_msg)
+
+        # exit edit mode
+        deactivated, displaying_msg = self._toggle_display_change(activate = False)
+
+        if not deactivated:
+            raise CaseEditingError(displaying_msg)
+
+    def start(self) -> CDispatch:
+        """
+        Starts UDM_DISPUTE transaction.
+
+        Returns:
+        -------
+        A GuiGridView object representing the search window.
+        """
+
+        self._cache.clear()
+        self.sess.StartTransaction("UDM_DISPUTE")
+        srch_mask = self._get_search_mask()
+
+        return srch_mask
+
+    def close(self):
+        """
+        Closes the running UDM_DISPUTE transaction.
+        """
+
+        self.sess.EndTransaction()
+
+        if self._is_popup_dialog():
+            self._close_popup_dialog(confirm = True)
+
+        self._cache.clear()
+
+    def search_dispute(self, search_mask: CDispatch, case: int) -> CDispatch:
+        """
+        Searches a disputed case in DMS based on the case ID. \n
+        See the module-level search_dispute() for details.
+        """
+
+        _set_case(search_mask, case)
+        self._execute_query()
+
+        n_found = _get_nfound(self.stat_bar.Text)
+        item_list = None
+
+        if n_found > 0:
+            item_list = self._get_grid_view()
+
+        return item_list
+
+    def search_disputes(self, search_mask: CDispatch, cases: tuple) -> tuple:
+        """
+        Searches disputed cases based in DMS on their database IDs. \n
+        See the module-level search_disputes() for details.
+        """
+
+        MAX_DISPUTES = 5000
+
+        if len(cases) > MAX_DISPUTES:
+            raise CaseCountError(f"The maximum limit of 5000 cases exceeded: {len(cases)}")
+
+        # the cases get validated while converted to the strings to paste
+        lines = []
+
+        for case in cases:
+
+            line = str(case)
+
+            if not line.isdigit():
+                raise ValueError(f"Incorrect case value found: {case}")
+
+            lines.append(line)
+
+        _set_hitlimit(search_mask, MAX_DISPUTES)
+        self._set_cases(search_mask, lines)
+        self._execute_query()
 
-    _get_control_toolbar().PressButton("TOGGLE_DISPLAY_CHANGE")
+        n_found = _get_nfound(self.stat_bar.Text)
+        item_list = None
 
-    msg = _stat_bar.Text
+        if n_found > 0:
+            item_list = self._get_grid_view()
 
-    if "display only" in msg:
-        return (False, msg)
+        return (item_list, n_found)
 
-    if not activate:
-        _main_wnd.SendVKey(_vkeys["F3"])
+    def modify_case_parameters(self, grid_view: CDispatch, root_cause: str = None,
+                               status_sales: str = None, status: CaseStates = CaseStates.Original):
+        """
+        Modifies parameters of a disputed case. \n
+        See the module-level modify_case_parameters() for details.
+        """
 
-    # handle alert dialogs for non-editable cases
-    if _is_popup_dialog():
+        _validate_case_parameters(root_cause, status_sales, status)
+        self._modify_case(grid_view, root_cause, status_sales, status)
 
-        err_msg = _sess.ActiveWindow.children(1).children(1).text
+    def export(self, grid_view: CDispatch, file_path: str, layout: str):
+        """
+        Exports disputed data into a plain text file. \n
+        See the module-level export() for details.
+        """
 
-        if err_msg == "Attributes may be overwritten later":
-            _close_popup_dialog(confirm = True)
-        else:
-            _close_popup_dialog(confirm = False)
-            _main_wnd.SendVKey(_vkeys["F3"])
-            return (False, err_msg)
+        self._apply_layout(grid_view, layout)
+        self._export_to_file(grid_view, file_path)
 
-    elif _is_error_message(_stat_bar):
-        err_msg = _stat_bar.Text
-        return (False, err_msg)
+# session used by the module-level procedures
+_default = None
 
-    return (True, "")
+def _get_default() -> DMSSession:
+    """
+    Returns the session started by start().
+    """
+
+    if _default is None:
+        raise TransactionNotStartedError(
+            "UDM_DISPUTE is not running! Use the biaDMS.start() "
+            "procedure to run the transaction first of all.")
+
+    return _default
 
 def start(sess: CDispatch) -> CDispatch:
     """
@@ -416,18 +698,11 @@ def start(sess: CDispatch) -> CDispatch:
     A GuiGridView object representing the search window.
     """
 
-    global _sess
-    global _main_wnd
-    global _stat_bar
+    global _default
 
-    _sess = sess
-    _main_wnd = _sess.findById("wnd[0]")
-    _stat_bar = _main_wnd.findById("sbar")
+    _default = DMSSession(sess)
 
-    _sess.StartTransaction("UDM_DISPUTE")
-    srch_mask = _get_search_mask()
-
-    return srch_mask
+    return _default.start()
 
 def close():
     """
@@ -448,44 +723,14 @@ def close():
         UDM_DISPUTE when it's not running.
     """
 
-    global _sess
-    global _main_wnd
-    global _stat_bar
+    global _default
 
-    if _sess is None:
+    if _default is None:
         raise TransactionNotStartedError("Cannot close FBL5N when it's actually not running!"
         "Use the biaFBL5N.start() procedure to run the transaction first of all.")
 
-    _sess.EndTransaction()
-
-    if _is_popup_dialog():
-        _close_popup_dialog(confirm = True)
-
-    _sess = None
-    _main_wnd = None
-    _stat_bar = None
-
-def _get_nfound(msg: str) -> int:
-
-    num = msg.split(" ")[0]
-    num = num.strip().replace(".", "")
-
-    return int(num)
-
-def _set_case(search_mask, case: int):
-    search_mask.ModifyCell(_SearchFieldIndexes.CaseID, "VALUE1", str(case))
-
-def _set_cases(search_mask: CDispatch, cases: list):
-
-    search_mask.PressButton(0, "SEL_ICON1")
-    _main_wnd.SendVKey(_vkeys["ShiftF4"])               # clear any previous values
-    copy_to_clipboard("\r\n".join(map(str, cases)))     # copy accounts to clipboard
-    _main_wnd.SendVKey(_vkeys["ShiftF12"])              # confirm selection
-    copy_to_clipboard("")                               # clear the clipboard
-    _main_wnd.SendVKey(_vkeys["F8"])                    # confirm
-
-def _set_hitlimit(search_mask, n_cases):
-    search_mask.ModifyCell(_SearchFieldIndexes.RestrictHitsTo, "VALUE1", n_cases)
+    _default.close()
+    _default = None
 
 def search_dispute(search_mask: CDispatch, case: int) -> CDispatch:
     """
@@ -504,16 +749,7 @@ def search_dispute(search_mask: CDispatch, case: int) -> CDispatch:
     A GuiGridView object representing the search result
     """
 
-    _set_case(search_mask, case)
-    _execute_query()
-
-    n_found = _get_nfound(_stat_bar.Text)
-    item_list = None
-
-    if n_found > 0:
-        item_list = _get_grid_view()
-
-    return item_list
+    return _get_default().search_dispute(search_mask, case)
 
 def search_disputes(search_mask: CDispatch, cases: tuple) -> tuple:
     """
@@ -538,26 +774,7 @@ def search_disputes(search_mask: CDispatch, cases: tuple) -> tuple:
         When the number of searched cases is mre than 5000.
     """
 
-    MAX_DISPUTES = 5000
-
-    for case in cases:
-        if not str(case).isnumeric():
-            raise ValueError(f"Incorrect case value found: {case}")
-
-    if len(cases) > MAX_DISPUTES:
-        raise CaseCountError(f"The maximum limit of 5000 cases exceeded: {len(cases)}")
-
-    _set_hitlimit(search_mask, MAX_DISPUTES)
-    _set_cases(search_mask, cases)
-    _execute_query()
-
-    n_found = _get_nfound(_stat_bar.Text)
-    item_list = None
-
-    if n_found > 0:
-        item_list = _get_grid_view()
-
-    return (item_list, n_found)
+    return _get_default().search_disputes(search_mask, cases)
 
 def modify_case_parameters(grid_view: CDispatch, root_cause: str = None, status_sales: str = None,
                            status: CaseStates = CaseStates.Original):
@@ -589,51 +806,7 @@ def modify_case_parameters(grid_view: CDispatch, root_cause: str = None, status_
         When attempting to change case parameters fails.
     """
 
-    if not (root_cause is None or isinstance(root_cause, RootCauses)):
-        raise TypeError(f"Argument 'root_cause' has incorrect type: {type(root_cause)}")
-
-    if not (status is None or isinstance(status, CaseStates)):
-        raise TypeError(f"Argument 'status' has incorrect type: {type(status)}")
-
-    MAX_FIELD_CHARS = 40
-
-    if status_sales is not None and len(status_sales) > MAX_FIELD_CHARS:
-        ValueError("The limit of 50 characters for 'Status Sales' exceeded!")
-
-    # open case details
-    grid_view.DoubleClickCurrentCell()
-
-    # enter edit mode
-    activated, err_msg = _toggle_display_change(activate = True)
-
-    if not activated:
-        _main_wnd.SendVKey(_vkeys["F3"])
-        raise CaseEditingError(err_msg)
-
-    param_mask = _get_param_mask()
-
-    if root_cause is not None:
-        _change_case_param(param_mask, 10, "VALUE2", root_cause.value)
-
-    if status != CaseStates.Original:
-        _change_case_status(param_mask, status.value)
-
-    if status_sales is not None:
-        _change_case_param(param_mask, 11, "VALUE1", status_sales)
-
-    saved, saving_msg = _save_changes()
-
-    if not saved:
-        _main_wnd.SendVKey(_vkeys["F3"])
-        if _is_popup_dialog():
-            _close_popup_dialog(confirm = False)
-        raise CaseEditingError(saving_msg)
-
-    # exit edit mode
-    deactivated, displaying_msg = _toggle_display_change(activate = False)
-
-    if not deactivated:
-        raise CaseEditingError(displaying_msg)
+    _get_default().modify_case_parameters(grid_view, root_cause, status_sales, status)
 
 def export(grid_view: CDispatch, file_path: str, layout: str):
     """
@@ -656,5 +829,4 @@ def export(grid_view: CDispatch, file_path: str, layout: str):
     None.
     """
 
-    _apply_layout(grid_view, layout)
-    _export_to_file(grid_view, file_path)
+    _get_default().export(grid_view, file_path, layout)
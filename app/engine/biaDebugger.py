@@ -2,37 +2,36 @@
 
 import logging
 import os
-
-import cv2
-import numpy as np
-import pyautogui
+import re
 
 _logger = logging.getLogger("master")
 
+_IMG_NAME_RE = re.compile(r"screen_(\d+)\.png$")
+
 def take_screenshot(img_folder: str = None, max_screens: int = None):
     """Takes a screenshot of the windows desktop."""
 
     if img_folder is None:
         img_folder = os.path.split(__file__)[0]
 
-    n_img = 1
     max_screens = 999 if max_screens is None else max_screens
     n_places = len(str(max_screens))
 
+    # the next screenshot gets the index following the highest one used
+    used = []
+
+    for file_name in os.listdir(img_folder):
+        match = _IMG_NAME_RE.match(file_name)
+        if match is not None:
+            used.append(int(match.group(1)))
+
+    n_img = max(used) + 1 if len(used) != 0 else 1
     idx = str(n_img).zfill(n_places)
-    img_name = f"screen_{idx}.png"
-    img_path = os.path.join(img_folder, img_name)
-
-    while os.path.isfile(img_path):
-        n_img += 1
-        idx = str(n_img).zfill(n_places)
-        img_name = f"screen_{idx}.png"
-        img_path = os.path.join(img_path, img_name)
-
-    _logger.info("Taking screenhot...")
-    image = pyautogui.screenshot()
-    _logger.info("Creating image...")
-    image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    _logger.info("Writing image...")
-    cv2.imwrite(img_path, image)
-    _logger.info("Image written.")
+    img_path = os.path.join(img_folder, f"screen_{idx}.png")
+
+    # pyautogui is loaded only when a screenshot is actually taken
+    import pyautogui # pylint: disable = C0415
+
+    # the screenshot is a PIL image, which writes PNG files itself
+    pyautogui.screenshot().save(img_path)
+    _logger.debug("Screenshot written: %s", img_path)
@@ -13,9 +13,11 @@ Version history:
 1.0.20220504 - removed unused virtual key mapping from _vkeys{}
 """
 
-from datetime import datetime, date
+from contextlib import contextmanager
+from datetime import date
 from os.path import exists, isfile, split
-from pyperclip import copy as copy_to_clipboard
+import re
+from typing import Union
 from win32com.client import CDispatch
 
 # custom warnings
@@ -82,17 +84,37 @@ _main_wnd = None
 _stat_bar = None
 
 # keyboard to SAP virtual keys mapping
-_vkeys = {
-    "Enter":        0,
-    "F3":           3,
-    "F8":           8,
-    "F9":           9,
-    "CtrlS":        11,
-    "F12":          12,
-    "ShiftF4":      16,
-    "ShiftF12":     24,
-    "CtrlF1":       25
-}
+_VK_ENTER = 0
+_VK_F3 = 3
+_VK_F8 = 8
+_VK_F9 = 9
+_VK_CTRLS = 11
+_VK_F12 = 12
+_VK_SHIFTF4 = 16
+_VK_CTRLF1 = 25
+
+# text fields of the search mask by their technical
+# names, valid until the next mask reload, see _cache_fields()
+_fields = {}
+
+_FIELD_NAMES = (
+    "PA_VARI",
+    "SO_AUGDT-LOW",
+    "SO_AUGDT-HIGH",
+    "DD_KUNNR-LOW",
+    "SO_WLKUN-LOW"
+)
+
+# status bar messages following item loading
+_LOAD_MSG_RE = re.compile(
+    r"(?P<loaded>items displayed)|(?P<reset>The current transaction was reset)"
+)
+
+# option list of the data export format dialog
+_FORMAT_OPTIONS_ID = "wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150"
+
+# single values table of the multiple selection dialog
+_SEL_TABLE_ID = "wnd[1]/usr/tabsTAB_STRIP/tabpSIVA/ssubSCREEN_HEADER:SAPLALDB:3010/tblSAPLALDBSINGLE"
 
 def _is_error_message(sbar: CDispatch) -> bool:
     """
@@ -144,9 +166,9 @@ def _close_popup_dialog(confirm: bool):
 
     if _sess.ActiveWindow.text == "Information":
         if confirm:
-            _main_wnd.SendVKey(_vkeys["Enter"]) # confirm
+            _main_wnd.SendVKey(_VK_ENTER) # confirm
         else:
-            _main_wnd.SendVKey(_vkeys["F12"])   # decline
+            _main_wnd.SendVKey(_VK_F12)   # decline
         return
 
     btn_caption = "Yes" if confirm else "No"
@@ -160,16 +182,47 @@ def _close_popup_dialog(confirm: bool):
             grandchild.Press()
             return
 
+@contextmanager
+def _locked_ui():
+    """
+    Locks the session GUI against user input and screen
+    updates while the search mask is being filled in.
+    """
+
+    _sess.LockSessionUI()
+
+    try:
+        yield
+    finally:
+        _sess.UnlockSessionUI()
+
+def _cache_fields():
+    """
+    Looks up the text fields of the search mask once the mask
+    is displayed in its final form. Fields not available in
+    the current mask mode are skipped.
+    """
+
+    _fields.clear()
+
+    for name in _FIELD_NAMES:
+
+        # FindById() returns None for a missing field instead of raising
+        fld = _main_wnd.FindById(f"usr/ctxt{name}", False)
+
+        if fld is not None:
+            _fields[name] = fld
+
 def _toggle_worklist(activate: bool):
     """
     Activates or deactivates the 'Use worklist' option
     in the transaction main search mask.
     """
 
-    used = _main_wnd.FindAllByName("PA_WLKUN", "GuiCTextField").Count > 0
+    used = _main_wnd.FindById("usr/ctxtPA_WLKUN", False) is not None
 
     if (activate and not used) or (not activate and used):
-        _main_wnd.SendVKey(_vkeys["CtrlF1"])
+        _main_wnd.SendVKey(_VK_CTRLF1)
 
 def _open_selection_list(sel_type: str):
     """
@@ -190,29 +243,26 @@ def _set_customer_account(val: str):
     field will be erased.
     """
 
-    fld_tech_name = ""
+    fld = _fields.get("SO_WLKUN-LOW")
 
-    if _main_wnd.FindAllByName("SO_WLKUN-LOW", "GuiCTextField").Count > 0:
-        fld_tech_name = "SO_WLKUN-LOW"
-    elif _main_wnd.FindAllByName("DD_KUNNR-LOW", "GuiCTextField").Count > 0:
-        fld_tech_name = "DD_KUNNR-LOW"
+    if fld is None:
+        fld = _fields["DD_KUNNR-LOW"]
 
-    _main_wnd.FindByName(fld_tech_name, "GuiCTextField").text = val
+    fld.text = val
 
 def _select_data_format(idx: int):
     """
     Selects data export format from the export options dialog
     based on the option index on the list.
     """
-    option_wnd = _sess.FindById("wnd[1]")
-    option_wnd.FindAllByName("SPOPLI-SELFLAG", "GuiRadioButton")(idx).Select()
+    _sess.FindById(f"{_FORMAT_OPTIONS_ID}/radSPOPLI-SELFLAG[{idx},0]").Select()
 
 def _set_layout(name: str):
     """
     Enters layout name into the 'Layout' field
     located on the main transaction window.
     """
-    _main_wnd.findByName("PA_VARI", "GuiCTextField").text = name
+    _fields["PA_VARI"].text = name
 
 def _set_company_codes(vals: list):
     """
@@ -220,42 +270,36 @@ def _set_company_codes(vals: list):
     the 'Company code' field list.
     """
 
-    _main_wnd.SendVKey(_vkeys["ShiftF4"])       # clear any previous values
-    s_company_codes = list(map(str, vals))
-    copy_to_clipboard("\r\n".join(s_company_codes))   # copy company codes to clipboard
-    _main_wnd.SendVKey(_vkeys["ShiftF12"])      # place values into the selection list
-    _main_wnd.SendVKey(_vkeys["F8"])            # confirm entered values
-    copy_to_clipboard("")               # clear the clipboard
+    _main_wnd.SendVKey(_VK_SHIFTF4)       # clear any previous values
 
-def _set_from_clr_date(val: str):
-    """
-    Enters date value to the first 'Posting date' field
-    located on the main transaction window.
-    """
-    _main_wnd.findByName("SO_BUDAT-LOW", "GuiCTextField").text = val
+    # the values are entered directly into the rows of the selection
+    # table, which gets scrolled once all its visible rows are filled
+    tbl = _sess.FindById(_SEL_TABLE_ID)
+    n_visible = tbl.VisibleRowCount
 
-def _set_to_clr_date(val: str):
-    """
-    Enters date value to the last 'Posting date' field
-    located on the main transaction window.
-    """
-    _main_wnd.findByName("SO_BUDAT-HIGH", "GuiCTextField").text = val
+    for idx, val in enumerate(vals):
 
-def _set_from_clr_date(day: date):
-    """
-    Enters date value to the first 'Cleared date' field
-    located on the main transaction window.
-    """
-    val = day.strftime("%d.%m.%Y")
-    _main_wnd.findByName("SO_AUGDT-LOW", "GuiCTextField").text = val
+        row_idx = idx % n_visible
 
-def _set_to_clr_date(day: date):
+        if idx != 0 and row_idx == 0:
+            tbl.VerticalScrollbar.Position = idx
+            tbl = _sess.FindById(_SEL_TABLE_ID) # scrolling renders the table anew
+
+        tbl.FindById(f"ctxtRSCSEL_255-SLOW_I[1,{row_idx}]").text = str(val)
+
+    _main_wnd.SendVKey(_VK_F8)            # confirm entered values
+
+def _set_clr_date(fld_name: str, val: Union[date, str]):
     """
-    Enters date value to the last 'Cleared date' field
-    located on the main transaction window.
+    Enters a date value to the 'Cleared date' field identified
+    by its technical name. Dates are entered in the SAP format,
+    strings (such as an empty string to clear the field) as is.
     """
-    val = day.strftime("%d.%m.%Y")
-    _main_wnd.findByName("SO_AUGDT-HIGH", "GuiCTextField").text = val
+
+    if isinstance(val, date):
+        val = val.strftime("%d.%m.%Y")
+
+    _fields[fld_name].text = val
 
 def _choose_line_item_selection(option: str):
     """
@@ -283,7 +327,7 @@ def _apply_document_filter(kind: str):
         assert False, "Unrecgnized value used!"
 
     # open filer menu
-    _main_wnd.SendVKey(_vkeys["ShiftF4"])
+    _main_wnd.SendVKey(_VK_SHIFTF4)
 
     # raise error for any unexpected
     # messages and let the caller handle it
@@ -300,7 +344,7 @@ def _load_items():
     """
 
     try:
-        _main_wnd.SendVKey(_vkeys["F8"])
+        _main_wnd.SendVKey(_VK_F8)
     except Exception as exc:
         raise SapRuntimeError("Loading of accounting data failed!") from exc
 
@@ -312,12 +356,15 @@ def _load_items():
     if _is_sap_runtime_error(_main_wnd):
         raise SapRuntimeError("SAP runtime error!")
 
-    if "items displayed" not in msg:
-        raise NoDataFoundWarning(msg)
+    match = _LOAD_MSG_RE.search(msg)
+    msg_kind = None if match is None else match.lastgroup
 
-    if "The current transaction was reset" in msg:
+    if msg_kind == "reset":
         raise SapRuntimeError("FBL5N was unexpectedly terminated!")
 
+    if msg_kind != "loaded":
+        raise NoDataFoundWarning(msg)
+
     if _is_error_message(_stat_bar):
         raise ItemsLoadingError(msg)
 
@@ -338,16 +385,17 @@ def _export_to_file(file_path: str, enc: str = "4120"):
         raise ValueError(f"Invalid file type: {file_path}. "
         "Only '.txt' file types are supported.")
 
-    _main_wnd.SendVKey(_vkeys["F9"])     # open local data file export dialog
+    _main_wnd.SendVKey(_VK_F9)     # open local data file export dialog
     _select_data_format(0)               # set plain text data export format
-    _main_wnd.SendVKey(_vkeys["Enter"])  # confirm
+    _main_wnd.SendVKey(_VK_ENTER)  # confirm
 
-    _sess.FindById("wnd[1]").FindByName("DY_PATH", "GuiCTextField").text = folder_path
-    _sess.FindById("wnd[1]").FindByName("DY_FILENAME", "GuiCTextField").text = file_name
-    _sess.FindById("wnd[1]").FindByName("DY_FILE_ENCODING", "GuiCTextField").text = enc
+    dlg_usr = _sess.FindById("wnd[1]/usr")
+    dlg_usr.FindById("ctxtDY_PATH").text = folder_path
+    dlg_usr.FindById("ctxtDY_FILENAME").text = file_name
+    dlg_usr.FindById("ctxtDY_FILE_ENCODING").text = enc
 
-    _main_wnd.SendVKey(_vkeys["CtrlS"])  # replace an exiting file
-    _main_wnd.SendVKey(_vkeys["F3"])     # Load main mask
+    _main_wnd.SendVKey(_VK_CTRLS)  # replace an exiting file
+    _main_wnd.SendVKey(_VK_F3)     # Load main mask
 
     # double check if data export succeeded
     if not isfile(file_path):
@@ -374,6 +422,7 @@ def start(sess: CDispatch):
     _sess = sess
     _main_wnd = _sess.findById("wnd[0]")
     _stat_bar = _main_wnd.findById("sbar")
+    _fields.clear()
 
     _sess.StartTransaction("FBL5N")
 
@@ -412,6 +461,7 @@ def close():
     _sess = None
     _main_wnd = None
     _stat_bar = None
+    _fields.clear()
 
 def export(file_path: str, layout: str, company_codes: list,
            from_clr_date: date = None, to_clr_date: date = None):
@@ -463,27 +513,31 @@ def export(file_path: str, layout: str, company_codes: list,
         if from_clr_date > to_clr_date:
             raise ValueError("Export 'from' date cannot be greated than export 'to' date!")
 
-    _toggle_worklist(activate = False)
-    _open_selection_list("company_codes")
-    _set_company_codes(company_codes)
-    _set_layout(layout)
-    _set_customer_account("")
-
-    if from_clr_date is not None and to_clr_date is None:
-        _set_from_clr_date(from_clr_date)
-        _set_to_clr_date(datetime.now.date())
-        _choose_line_item_selection("cleared_items")
-    elif from_clr_date is None and to_clr_date is not None:
-        _set_from_clr_date("")
-        _set_to_clr_date(to_clr_date)
-        _choose_line_item_selection("cleared_items")
-    elif from_clr_date is not None and to_clr_date is not None:
-        _set_from_clr_date(from_clr_date)
-        _set_to_clr_date(to_clr_date)
-        _choose_line_item_selection("cleared_items")
-    else:
-        _choose_line_item_selection("open_items")
+    with _locked_ui():
+
+        _toggle_worklist(activate = False)
+        _open_selection_list("company_codes")
+        _set_company_codes(company_codes)
+        _cache_fields()
+        _set_layout(layout)
+        _set_customer_account("")
+
+        if from_clr_date is not None and to_clr_date is None:
+            _set_clr_date("SO_AUGDT-LOW", from_clr_date)
+            _set_clr_date("SO_AUGDT-HIGH", date.today())
+            _choose_line_item_selection("cleared_items")
+        elif from_clr_date is None and to_clr_date is not None:
+            _set_clr_date("SO_AUGDT-LOW", "")
+            _set_clr_date("SO_AUGDT-HIGH", to_clr_date)
+            _choose_line_item_selection("cleared_items")
+        elif from_clr_date is not None and to_clr_date is not None:
+            _set_clr_date("SO_AUGDT-LOW", from_clr_date)
+            _set_clr_date("SO_AUGDT-HIGH", to_clr_date)
+            _choose_line_item_selection("cleared_items")
+        else:
+            _choose_line_item_selection("open_items")
+
+        _apply_document_filter("credit_memo")
 
-    _apply_document_filter("credit_memo")
     _load_items()
     _export_to_file(file_path)
@@ -1,4 +1,4 @@
-# pylint: disable = C0103, R1711, W1203
+# pylint: disable = C0103, R1711, W0603
 
 """
 The 'biaMail.py' module
@@ -15,15 +15,20 @@ Version history:
                procedure.
 """
 
-from email import encoders
+from base64 import encodebytes
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache, partial
 import logging
 from os.path import isfile, split
 import re
 import socket
-from smtplib import SMTP
+from smtplib import (
+    quoteaddr, SMTP, SMTPDataError, SMTPException,
+    SMTPRecipientsRefused, SMTPSenderRefused, SMTPServerDisconnected
+)
 from typing import Union
 
 # custom message classes
@@ -61,8 +66,117 @@ class InvalidSmtpHostError(Exception):
     is used for SMTP connection.
     """
 
+class _PipeliningSMTP(SMTP):
+    """
+    An SMTP connection that sends the MAIL and RCPT commands
+    of a message at once and reads their replies afterwards
+    if the server supports pipelining (RFC 2920).
+    """
+
+    def sendmail(self, from_addr, to_addrs, msg, mail_options = (), rcpt_options = ()):
+
+        self.ehlo_or_helo_if_needed()
+
+        # SMTPUTF8 messages need the command encoding switched
+        # by SMTP.mail(), hence these are left to the base class
+        utf8 = any(opt.lower() == "smtputf8" for opt in mail_options)
+
+        if utf8 or isinstance(msg, str) or not self.has_extn("pipelining"):
+            return super().sendmail(from_addr, to_addrs, msg, mail_options, rcpt_options)
+
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+
+        mail_opts = list(mail_options)
+
+        if self.has_extn("size"):
+            mail_opts.insert(0, f"size={len(msg)}")
+
+        mail_optlist = "".join(f" {opt}" for opt in mail_opts)
+        rcpt_optlist = "".join(f" {opt}" for opt in rcpt_options)
+
+        self.putcmd("mail", f"FROM:{quoteaddr(from_addr)}{mail_optlist}")
+
+        for addr in to_addrs:
+            self.putcmd("rcpt", f"TO:{quoteaddr(addr)}{rcpt_optlist}")
+
+        mail_code, mail_resp = self.getreply()
+        senderrs = {}
+
+        for addr in to_addrs:
+
+            code, resp = self.getreply()
+
+            if code not in (250, 251):
+                senderrs[addr] = (code, resp)
+
+            if code == 421:
+                self.close()
+                raise SMTPRecipientsRefused(senderrs)
+
+        if mail_code != 250:
+            if mail_code == 421:
+                self.close()
+            else:
+                self._rset()
+            raise SMTPSenderRefused(mail_code, mail_resp, from_addr)
+
+        if len(senderrs) == len(to_addrs):
+            self._rset()
+            raise SMTPRecipientsRefused(senderrs)
+
+        code, resp = self.data(msg)
+
+        if code != 250:
+            if code == 421:
+                self.close()
+            else:
+                self._rset()
+            raise SMTPDataError(code, resp)
+
+        return senderrs
+
 _logger = logging.getLogger("master")
 
+# size of attachment data encoded at once
+_B64_CHUNK_SIZE = 57 * 1024
+
+# size of the read buffer of attachment files, the
+# files being often read from slow network shares
+_READ_BUFFER_SIZE = 1 << 20
+
+# connection to the SMTP server reused across
+# sent messages, see open_smtp() and close_smtp()
+_smtp_conn = None
+_smtp_addr = None
+
+# company email address in the 'name.surname@ledvance.com' format
+_LEDVANCE_MAIL_RE = re.compile(r"\w+\.\w+@ledvance\.com")
+
+@lru_cache(maxsize = 64)
+def _validate_emails(mails: tuple) -> tuple:
+    """
+    Trims email addresses and validates them. The result is cached,
+    since the same recipient lists are used for each message.
+    """
+
+    validated = []
+
+    for mail in mails:
+
+        stripped = mail.strip()
+        validated.append(stripped)
+
+        # check if email is Ledvance-specific
+        match = _LEDVANCE_MAIL_RE.fullmatch(stripped)
+
+        if match is not None:
+            continue
+
+        _logger.warning("Possibly invalid email address used: '%s'.", stripped)
+
+    return tuple(validated)
+
 def _sanitize_emails(addr: Union[str,list]) -> list:
     """
     Trims email addresses and validates
@@ -73,60 +187,60 @@ def _sanitize_emails(addr: Union[str,list]) -> list:
     if not isinstance(addr, str) and len(addr) == 0:
         raise ValueError("No message recipients provided in 'to_addr' argument!")
 
-    mails = []
-    validated = []
-
     if isinstance(addr, str):
-        mails = [addr]
+        mails = (addr,)
     elif isinstance(addr, list):
-        mails = addr
+        mails = tuple(addr)
     else:
         raise TypeError(f"Argument 'addr' has invalid type: {type(addr)}")
 
-    for mail in mails:
-
-        stripped = mail.strip()
-        validated.append(stripped)
-
-        # check if email is Ledvance-specific
-        match = re.search(r"\w+\.\w+@ledvance.com", stripped)
+    return list(_validate_emails(mails))
 
-        if match is not None:
-            continue
+def _encode_file(file_path: str) -> str:
+    """
+    Reads a file and returns its content encoded to base64.
+    """
 
-        _logger.warning(f"Possibly invalid email address used: '{stripped}'.")
+    # the file is encoded chunk by chunk, the chunk size being a multiple
+    # of the 57 bytes encoded to a single 76 chars base64 line
+    with open(file_path, "rb", buffering = _READ_BUFFER_SIZE) as file:
+        encoded = b"".join(map(encodebytes, iter(partial(file.read, _B64_CHUNK_SIZE), b"")))
 
-    return validated
+    return encoded.decode("ascii")
 
 def _attach_files(email: SmtpMessage, att_paths: list) -> SmtpMessage:
     """
     Attaches files to a SmtpMessage object.
     """
 
+    # Check whether all email attachmment paths
+    # exist before any of the files gets read
     for att_path in att_paths:
-
-        # Check whether email
-        # attachmment path exists
         if not isfile(att_path):
             raise AttachmentNotFoundError(f"Attachment not found: {att_path}")
 
-        with open(att_path, "rb") as file:
-            payload = file.read()
+    # the files are read in parallel, since these
+    # are often located on slow network shares
+    if len(att_paths) > 1:
+        with ThreadPoolExecutor(max_workers = min(8, len(att_paths))) as executor:
+            payloads = list(executor.map(_encode_file, att_paths))
+    else:
+        payloads = list(map(_encode_file, att_paths))
+
+    for att_path, payload in zip(att_paths, payloads):
 
         # The content type "application/octet-stream" means
         # that a MIME attachment is a binary file
         part = MIMEBase("application", "octet-stream")
         part.set_payload(payload)
-        encoders.encode_base64(part)
+        part["Content-Transfer-Encoding"] = "base64"
 
         # get file name
         file_name = split(att_path)[1]
 
-        # Add header
-        part.add_header(
-            "Content-Disposition",
-            f"attachment; filename = {file_name}"
-        )
+        # Add header, the file name parameter gets quoted
+        # (and RFC 2231 encoded if needed) by add_header()
+        part.add_header("Content-Disposition", "attachment", filename = file_name)
 
         # Add attachment to the message
         # and convert it to a string
@@ -197,9 +311,89 @@ def create_message(from_addr: str, to_addr: Union[str,list], subj: str,
 
     return email
 
+def open_smtp(host: str, port: int) -> SMTP:
+    """
+    Opens a connection to SMTP server. The connection is \n
+    reused by send_smtp_message() for all messages sent \n
+    via the same server until close_smtp() is called.
+
+    Params:
+    -------
+    host:
+        Name of the SMTP host server used for message sending.
+
+    port:
+        Number o the SMTP server port.
+
+    Returns:
+    --------
+    An SMTP object representing the open connection.
+
+    Raises:
+    -------
+    InvalidSmtpHostError:
+        When an invalid host name is used.
+
+    TimeoutError:
+        When attempting to connect to the SMTP server times out.
+    """
+
+    global _smtp_conn
+    global _smtp_addr
+
+    if _smtp_conn is not None and _smtp_addr == (host, port):
+        return _smtp_conn
+
+    close_smtp()
+
+    try:
+        smtp_conn = _PipeliningSMTP(host, port, timeout = 30)
+    except socket.gaierror as exc:
+        raise InvalidSmtpHostError(f"Invalid SMTP host name: {host}") from exc
+    except TimeoutError as exc:
+        raise TimeoutError("Attempt to connect to the SMTP servr timed out! Possible reasons: "
+        "Slow internet connection or an incorrect port number used.") from exc
+
+    smtp_conn.set_debuglevel(0) # off = 0; verbose = 1; timestamped = 2
+
+    _smtp_conn = smtp_conn
+    _smtp_addr = (host, port)
+
+    return smtp_conn
+
+def close_smtp():
+    """
+    Closes the connection to SMTP server
+    opened by open_smtp(), if any.
+
+    Params:
+    -------
+    None.
+
+    Returns:
+    --------
+    None.
+    """
+
+    global _smtp_conn
+    global _smtp_addr
+
+    if _smtp_conn is None:
+        return
+
+    try:
+        _smtp_conn.quit()
+    except (SMTPException, OSError):
+        _smtp_conn.close() # the server already dropped the connection
+    finally:
+        _smtp_conn = None
+        _smtp_addr = None
+
 def send_smtp_message(msg: SmtpMessage, host: str, port: int):
     """
-    Sends a message using SMTP server.
+    Sends a message using SMTP server. The connection \n
+    to the server is opened on the first call and kept \n
+    open for the next messages, see open_smtp().
 
     Params:
     -------
@@ -225,15 +419,18 @@ def send_smtp_message(msg: SmtpMessage, host: str, port: int):
         When attempting to connect to the SMTP server times out.
     """
 
+    # the message is serialized by send_message()
+    # straight to bytes, no string copy is created
+    recips = msg["To"].split(";")
+    smtp_conn = open_smtp(host, port)
+
     try:
-        with SMTP(host, port, timeout = 30) as smtp_conn:
-            smtp_conn.set_debuglevel(0) # off = 0; verbose = 1; timestamped = 2
-            send_errs = smtp_conn.sendmail(msg["From"], msg["To"].split(";"), msg.as_string())
-    except socket.gaierror as exc:
-        raise InvalidSmtpHostError(f"Invalid SMTP host name: {host}") from exc
-    except TimeoutError as exc:
-        raise TimeoutError("Attempt to connect to the SMTP servr timed out! Possible reasons: "
-        "Slow internet connection or an incorrect port number used.") from exc
+        send_errs = smtp_conn.send_message(msg, msg["From"], recips)
+    except SMTPServerDisconnected:
+        # servers drop idle connections, hence one reconnect is attempted
+        close_smtp()
+        smtp_conn = open_smtp(host, port)
+        send_errs = smtp_conn.send_message(msg, msg["From"], recips)
 
     if len(send_errs) != 0:
         failed_recips = ';'.join(send_errs.keys())
@@ -16,10 +16,15 @@ Version history:
 """
 
 from collections import namedtuple
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from io import BytesIO
 import logging
+from mmap import mmap, ACCESS_READ
+from os import fstat
 from os.path import isfile
 import re
+import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series
 
@@ -42,24 +47,46 @@ _RC_DISPUTE_UNJUSTIFIED = "L00"
 _RC_CHARGE_OFF = "L08"
 _RC_BELOW_THRESHOLD = "L14"
 
+# date format used in the DMS export
+_DATE_FORMAT = "%d.%m.%Y"
+
+# SAP number format to the float literal format
+_AMOUNT_TRANS = str.maketrans({".": "", ",": "."})
+
+# credit note number
+_PRECREDIT_NOTE_RX = re.compile(r"0?50\d{7}")
+
+# more than one precredit note number
+_MULTI_PRECREDIT_RX = re.compile(r"501\d{6}.*?501\d{6}")
+
+# lines of the exported data without the enclosing pipes,
+# the data is kept encoded and may use Windows line breaks
+_FBL5N_LINE_RX = re.compile(rb"^\|(\s*\d{9}.*)\|\r?$", re.M)
+_DMS_LINE_RX = re.compile(rb"^\|(\s*\d+\s*\|.*?)\|?\r?$", re.M)
+
 _logger = logging.getLogger("master")
 
-def _generate_status_sales(old_val: str, credit_note: int) -> str:
+def _generate_status_sales(old_vals: Series, credit_notes: Series) -> Series:
     """
-    Returns new 'Status sales' value containing the credit note number.
+    Returns new 'Status sales' values containing the credit note numbers. \n
+    The precredit note numbers contained in the old values are replaced \n
+    with the credit note number, otherwise the number is appended. The \n
+    old values are expected not to contain the credit note number yet.
     """
 
-    PRECREDIT_NOTE_RX = r"0?(50)\d{7}" # credit note number
-    new_val = ""
+    notes = credit_notes.astype("string")
+    has_precredit = old_vals.str.contains(_PRECREDIT_NOTE_RX)
 
-    if str(credit_note) in old_val:
-        new_val = pd.NA
-    elif re.search(PRECREDIT_NOTE_RX, old_val) is not None:
-        new_val = re.sub(PRECREDIT_NOTE_RX, str(credit_note), old_val)
-    else:
-        new_val = " ".join([old_val, str(credit_note)]).strip()
+    new_vals = (old_vals + " " + notes).str.strip()
 
-    return new_val
+    # the replacement differs per row, hence it can't be vectorized,
+    # yet it's run only for the rows where a number is replaced
+    new_vals[has_precredit] = [
+        _PRECREDIT_NOTE_RX.sub(note, val) for val, note in zip(
+            old_vals[has_precredit], notes[has_precredit])
+    ]
+
+    return new_vals
 
 def _generate_ci_params(closed_items: DataFrame) -> DataFrame:
     """
@@ -86,17 +113,14 @@ def _generate_ci_params(closed_items: DataFrame) -> DataFrame:
     # text if status sales already contains the number
     has_credit_node = (subset["Contains_Credit_Note"])
 
-    subset.loc[has_credit_node, "Message"] = subset.loc[has_credit_node, "Message"].apply(
-        lambda x: " ".join([x, "Status sales unchanged."])
-    )
+    subset.loc[has_credit_node, "Message"] = subset.loc[has_credit_node, "Message"] + " Status sales unchanged."
 
-    subset.loc[~has_credit_node, "New_Status_Sales"] = subset.loc[~has_credit_node].apply(
-        lambda x: _generate_status_sales(x["Status_Sales"], x["Document_Number"]), axis = 1
+    subset.loc[~has_credit_node, "New_Status_Sales"] = _generate_status_sales(
+        subset.loc[~has_credit_node, "Status_Sales"],
+        subset.loc[~has_credit_node, "Document_Number"]
     )
 
-    subset.loc[~has_credit_node, "Message"] = subset.loc[~has_credit_node, "Message"].apply(
-        lambda x: " ".join([x, "Status sales updated."])
-    )
+    subset.loc[~has_credit_node, "Message"] = subset.loc[~has_credit_node, "Message"] + " Status sales updated."
 
     # update root cause code where the existing value is other than L00, L01, L06 or L14
     expected_rtc = subset["Root_Cause"].isin((
@@ -104,28 +128,18 @@ def _generate_ci_params(closed_items: DataFrame) -> DataFrame:
         _RC_BELOW_THRESHOLD, _RC_DISPUTE_UNJUSTIFIED
     ))
 
-    subset.loc[expected_rtc, "Message"] = subset.loc[expected_rtc, "Message"].apply(
-        lambda x: " ".join([x, "Root cause unchanged."])
-    )
+    subset.loc[expected_rtc, "Message"] = subset.loc[expected_rtc, "Message"] + " Root cause unchanged."
 
     subset.loc[~expected_rtc, "New_Root_Cause"] = _RC_CREDIT_NOTE_ISSUED
 
-    subset.loc[~expected_rtc, "Message"] = subset.loc[~expected_rtc, "Message"].apply(
-        lambda x: " ".join([x, "Root cause changed to L06."])
-    )
+    subset.loc[~expected_rtc, "Message"] = subset.loc[~expected_rtc, "Message"] + " Root cause changed to L06."
 
     # select items that will be processed in DMS
-    subset.loc[subset.query(
-        "New_Status.notna() or "
-        "New_Root_Cause.notna() or "
-        "New_Status_Sales.notna()"
-    ).index, "Changed"] = True
-
-    subset.loc[subset.query(
-        "New_Status.isna() and "
-        "(New_Root_Cause.notna() or "
-        "New_Status_Sales.notna())"
-    ).index, "Modified"] = True
+    new_stat = subset["New_Status"].notna()
+    new_params = subset["New_Root_Cause"].notna() | subset["New_Status_Sales"].notna()
+
+    subset.loc[new_stat | new_params, "Changed"] = True
+    subset.loc[~new_stat & new_params, "Modified"] = True
 
     # place the changed data subset
     # back to the copy of original data
@@ -163,45 +177,32 @@ def _generate_oi_params(open_items: DataFrame) -> DataFrame:
     # text if status sales already contains the number
     has_credit_node = (subset["Contains_Credit_Note"])
 
-    subset.loc[has_credit_node, "Message"] = subset.loc[has_credit_node, "Message"].apply(
-        lambda x: " ".join([x, "Status sales unchanged."])
-    )
+    subset.loc[has_credit_node, "Message"] = subset.loc[has_credit_node, "Message"] + " Status sales unchanged."
 
-    subset.loc[~has_credit_node, "New_Status_Sales"] = subset.loc[~has_credit_node].apply(
-        lambda x: _generate_status_sales(x["Status_Sales"], x["Document_Number"]), axis = 1
+    subset.loc[~has_credit_node, "New_Status_Sales"] = _generate_status_sales(
+        subset.loc[~has_credit_node, "Status_Sales"],
+        subset.loc[~has_credit_node, "Document_Number"]
     )
 
-    subset.loc[~has_credit_node, "Message"] = subset.loc[~has_credit_node, "Message"].apply(
-        lambda x: " ".join([x, "Status sales updated."])
-    )
+    subset.loc[~has_credit_node, "Message"] = subset.loc[~has_credit_node, "Message"] + " Status sales updated."
 
     # update root cause code where the root cause code is other than L06, L01 or L14
     expected_rtc = subset["Root_Cause"].isin((_RC_CREDIT_NOTE_ISSUED, _RC_PAYMENT_AGREEMENT, _RC_BELOW_THRESHOLD))
 
-    subset.loc[expected_rtc, "Message"] = subset.loc[expected_rtc, "Message"].apply(
-        lambda x: " ".join([x, "Root cause unchanged."])
-    )
+    subset.loc[expected_rtc, "Message"] = subset.loc[expected_rtc, "Message"] + " Root cause unchanged."
 
     subset.loc[~expected_rtc, "New_Root_Cause"] = _RC_CREDIT_NOTE_ISSUED
 
-    subset.loc[~expected_rtc, "Message"] = subset.loc[~expected_rtc, "Message"].apply(
-        lambda x: " ".join([x, "Root cause changed to L06."])
-    )
+    subset.loc[~expected_rtc, "Message"] = subset.loc[~expected_rtc, "Message"] + " Root cause changed to L06."
 
     copied.loc[subset.index] = subset
 
     # select items that will be processed in DMS
-    copied.loc[copied.query(
-        "New_Status.notna() or "
-        "New_Root_Cause.notna() or "
-        "New_Status_Sales.notna()"
-    ).index, "Changed"] = True
-
-    copied.loc[copied.query(
-        "New_Status.isna() and "
-        "(New_Root_Cause.notna() or "
-        "New_Status_Sales.notna())"
-    ).index, "Modified"] = True
+    new_stat = copied["New_Status"].notna()
+    new_params = copied["New_Root_Cause"].notna() | copied["New_Status_Sales"].notna()
+
+    copied.loc[new_stat | new_params, "Changed"] = True
+    copied.loc[~new_stat & new_params, "Modified"] = True
 
     return copied
 
@@ -220,61 +221,82 @@ def _parse_amounts(vals: Series) -> Series:
     A Series object containing parsed floats.
     """
 
-    repl = vals.str.replace(".", "", regex = False).str.replace(",", ".", regex = False)
-    repl = repl.mask(repl.str.endswith("-"), "-" + repl.str.rstrip("-"))
-    conv = pd.to_numeric(repl).astype("float64")
+    # thousands separators are removed and decimal commas
+    # replaced in a single pass over the strings
+    repl = vals.str.translate(_AMOUNT_TRANS)
+
+    # SAP places the minus sign after the number
+    negative = repl.str.endswith("-")
+    conv = pd.to_numeric(repl.str.rstrip("-")).astype("float64")
+    conv = conv.mask(negative.fillna(False).astype(bool), -conv)
 
     return conv
 
+def _read_lines(file_path: str, line_rx: re.Pattern) -> bytes:
+    """
+    Reads lines matching a pattern from a file. \n
+    Returns the matched lines stored as bytes.
+    """
+
+    with open(file_path, 'rb') as stream:
+
+        # empty files can't be mapped to memory
+        if fstat(stream.fileno()).st_size == 0:
+            return b""
+
+        # the file is mapped to memory and scanned in place,
+        # hence only the matched lines get copied into memory
+        with mmap(stream.fileno(), 0, access = ACCESS_READ) as mapped:
+            lines = b"\n".join(line_rx.findall(mapped))
+
+    return lines
+
 def _read_fbl5n_data(file_paths: list) -> list:
     """
-    Reads raw textual data exported from FBL5N. \n
-    Returns a list of file contents stored as strings.
+    Reads lines containing account items from \n
+    raw textual data exported from FBL5N, stripped \n
+    of the leading and trailing pipes. \n
+    Returns a list of lines stored as bytes per file.
     """
 
     if len(file_paths) == 0:
         raise ValueError("Argument 'file_paths' is empty!")
 
-    texts = []
+    read_lines = partial(_read_lines, line_rx = _FBL5N_LINE_RX)
 
-    for f_path in file_paths:
-        with open(f_path, 'r', encoding = "utf-8") as stream:
-            texts.append(stream.read())
+    # the files are read in parallel, since these
+    # are often located on slow network shares
+    if len(file_paths) > 1:
+        with ThreadPoolExecutor(max_workers = min(8, len(file_paths))) as executor:
+            texts = list(executor.map(read_lines, file_paths))
+    else:
+        texts = list(map(read_lines, file_paths))
 
     return texts
 
-def _preprocess_fbl5n_data(text: str) -> str:
+def _preprocess_fbl5n_data(texts: list) -> bytes:
     """
     Performs preprocessing operations on \n
-    raw textual data exported from FBL5N:
-    - extracting lines containing account items
-    - removing leading and trailing pipes from lines
+    lines read from the FBL5N data:
+    - joining lines read from separate files
     - removing double quotes from text
     """
 
-    matches = re.findall(r"^\|\s*\d{9}.*\|$", text, re.M)
-    del text
+    lines = b"\n".join(text for text in texts if len(text) != 0)
+    del texts
 
-    lines = "\n".join(matches)
-    del matches
+    return lines.translate(None, b"\"")
 
-    replaced = re.sub(r"^\|", "", lines, flags = re.M)
-    del lines
-
-    replaced = re.sub(r"\|$", "", replaced, flags = re.M)
-    replaced = re.sub(r"\"", "", replaced, flags = re.M)
-
-    return replaced
-
-def _parse_fbl5n_data(preproc: str) -> DataFrame:
+def _parse_fbl5n_data(preproc: bytes) -> DataFrame:
     """
     Parses the preprocessed FBL5N textual \n
     data into a DataFrame object.
     """
 
-    parsed = pd.read_csv(StringIO(preproc),
+    parsed = pd.read_csv(BytesIO(preproc),
         sep = "|",
         dtype = "string",
+        encoding = "utf-8",
         names =  [
             "Document_Number",
             "DC_Amount",
@@ -298,13 +320,13 @@ def _clean_fbl5n_data(parsed: DataFrame) -> DataFrame:
     tax sybols.
     """
 
-    # remove leading and trailing non-printable chars form data
-    for col in parsed.columns:
-        parsed[col] = parsed[col].str.strip()
+    # remove leading and trailing non-printable chars form data,
+    # the stripped columns are collected into a new frame at once
+    stripped = parsed.apply(lambda col: col.str.strip())
 
     # replace non-standard tax with empty strings
-    cleaned = parsed.assign(
-        tax = parsed["Tax"].replace("**", "")
+    cleaned = stripped.assign(
+        tax = stripped["Tax"].replace("**", "")
     )
 
     return cleaned
@@ -315,7 +337,9 @@ def _convert_fbl5n_data(cleaned: DataFrame) -> DataFrame:
     to appropriate data types.
     """
 
-    converted = cleaned.copy()
+    # the converted columns replace the original ones, hence the
+    # column data needs not be copied
+    converted = cleaned.copy(deep = False)
     converted["DC_Amount"] = _parse_amounts(cleaned["DC_Amount"])
     converted["Branch"] = pd.to_numeric(cleaned["Branch"]).astype("UInt64")
     converted["Document_Number"] = cleaned["Document_Number"].astype("UInt64")
@@ -326,45 +350,26 @@ def _convert_fbl5n_data(cleaned: DataFrame) -> DataFrame:
     return converted
 
 
-def _read_dms_data(file_path: str) -> str:
-    """
-    Reads raw textual data exported from DMS. \n
-    Returns file content stored as a string.
-    """
-
-    with open(file_path, 'r', encoding = "utf-8") as stream:
-        txt = stream.read()
-
-    return txt
-
-def _preprocess_dms_data(text: str) -> str:
+def _read_dms_data(file_path: str) -> bytes:
     """
-    Performs preprocessing operations on \n
-    raw textual data exported from FBL5N:
-    - extracting lines containing account items
-    - removing leading and trailing pipes from lines
+    Reads lines containing case items from \n
+    raw textual data exported from DMS, stripped \n
+    of the leading and trailing pipes. \n
+    Returns the lines stored as bytes.
     """
 
-    matches = re.findall(r"^\|\s*\d+\s*\|.*$", text, re.M)
-    del text
-
-    lines = "\n".join(matches)
-    del matches
+    return _read_lines(file_path, _DMS_LINE_RX)
 
-    replaced = re.sub(r"^\|", "", lines, flags = re.M)
-    replaced = re.sub(r"\|$", "", replaced, flags = re.M)
-
-    return replaced
-
-def _parse_dms_data(preproc: str):
+def _parse_dms_data(preproc: bytes):
     """
     Parses the preprocessed DMS textual \n
     data into a DataFrame object.
     """
 
-    parsed = pd.read_csv(StringIO(preproc),
+    parsed = pd.read_csv(BytesIO(preproc),
         sep = "|",
         dtype = "string",
+        encoding = "utf-8",
         names = [
             "Case_ID",
             "Head_Office",
@@ -396,10 +401,12 @@ def _convert_dms_data(cleaned: DataFrame) -> DataFrame:
     into appropriate data types.
     """
 
-    converted = cleaned.copy()
+    # the converted columns replace the original ones, hence the
+    # column data needs not be copied
+    converted = cleaned.copy(deep = False)
     converted["Case_ID"] = pd.to_numeric(cleaned["Case_ID"]).astype("UInt64")
-    converted["Created_On"] = pd.to_datetime(cleaned["Created_On"],dayfirst = True).dt.date
-    converted["Solved_On"] = pd.to_datetime(cleaned["Solved_On"], dayfirst = True).dt.date
+    converted["Created_On"] = pd.to_datetime(cleaned["Created_On"], format = _DATE_FORMAT, errors = "coerce").dt.date
+    converted["Solved_On"] = pd.to_datetime(cleaned["Solved_On"], format = _DATE_FORMAT, errors = "coerce").dt.date
     converted["Head_Office"] = pd.to_numeric(cleaned["Head_Office"]).astype("UInt64")
     converted["Debitor"] = pd.to_numeric(cleaned["Debitor"]).astype("UInt64")
     converted["Disputed_Amount"] = _parse_amounts(cleaned["Disputed_Amount"])
@@ -416,14 +423,13 @@ def _clean_dms_data(parsed: DataFrame) -> DataFrame:
     - replacing missing vals.
     """
 
-    for col in parsed.columns:
-        parsed[col] = parsed[col].str.strip()
+    stripped = parsed.apply(lambda col: col.str.strip())
 
     # replace missing amounts with zero and
     # missing root cause codes with the 'NIL' flag.
-    cleaned = parsed.assign(
-        Disputed_Amount = parsed["Disputed_Amount"].replace("", "0,00"),
-        Root_Cause = parsed["Root_Cause"].fillna("NIL")
+    cleaned = stripped.assign(
+        Disputed_Amount = stripped["Disputed_Amount"].replace("", "0,00"),
+        Root_Cause = stripped["Root_Cause"].fillna("NIL")
     )
 
     return cleaned
@@ -444,7 +450,13 @@ def convert_fbl5n_data(file_paths: list) -> DataFrame:
     """
 
     texts = _read_fbl5n_data(file_paths)
-    preproc = _preprocess_fbl5n_data("".join(texts))
+    preproc = _preprocess_fbl5n_data(texts)
+
+    # an export containing no item lines
+    # leaves no text for the parser to read
+    if len(preproc) == 0:
+        return None
+
     parsed = _parse_fbl5n_data(preproc)
 
     if parsed.empty:
@@ -455,6 +467,34 @@ def convert_fbl5n_data(file_paths: list) -> DataFrame:
 
     return converted
 
+def concat_fbl5n_data(parts: list) -> DataFrame:
+    """
+    Concatenates FBL5N data converted from separate files.
+
+    Params:
+    -------
+    parts:
+        DataFrame objects returned by convert_fbl5n_data().
+
+    Returns:
+    --------
+    Concatenated panel data in the form of DataFrame
+    object on success, None if there's no data to concatenate.
+    """
+
+    parts = [part for part in parts if part is not None]
+
+    if len(parts) == 0:
+        return None
+
+    concatenated = pd.concat(parts, ignore_index = True)
+
+    # categories that differ across the parts are concatenated as objects
+    concatenated["Tax"] = concatenated["Tax"].astype("category")
+    concatenated["Company_Code"] = concatenated["Company_Code"].astype("category")
+
+    return concatenated
+
 def convert_dms_data(file_path: str) -> DataFrame:
     """
     Converts plain DMS text data to a panel dataset.
@@ -473,9 +513,8 @@ def convert_dms_data(file_path: str) -> DataFrame:
     if not isfile(file_path):
         raise ValueError(f"Path to the data file not found: {file_path}")
 
-    text = _read_dms_data(file_path)
-    preproc = _preprocess_dms_data(text)
-    parsed = _parse_dms_data(preproc)
+    lines = _read_dms_data(file_path)
+    parsed = _parse_dms_data(lines)
 
     if parsed.empty:
         return None
@@ -505,16 +544,24 @@ def assign_country(data: DataFrame, mapper: dict) -> DataFrame:
     if len(mapper) == 0:
         raise ValueError("Argument 'mapper' contains no records!")
 
+    # the company codes are mapped in a single pass, for categorical
+    # codes only the categories get mapped; few distinct names repeat
+    # on every row, hence the result is stored as a category as well
     assigned = data.assign(
-        Country = pd.NA
+        Country = data["Company_Code"].map(mapper).astype("category")
     )
 
-    for cmp_cd in mapper:
-        idx = data[data["Company_Code"] == cmp_cd].index
-        assigned.loc[idx, "Country"] = mapper[cmp_cd]
-
     return assigned
 
+@lru_cache(maxsize = None)
+def _compile_case_rx(case_patt: str) -> re.Pattern:
+    """
+    Compiles a regex pattern matching case ID \n
+    numbers of a country in the document texts.
+    """
+
+    return re.compile(fr"D[P]?\s*[-_/]?({case_patt})")
+
 def extract_cases(data: DataFrame, case_patts: dict) -> DataFrame:
     """
     Extracts case ID values contained the strings of the 'Text' field.
@@ -539,7 +586,6 @@ def extract_cases(data: DataFrame, case_patts: dict) -> DataFrame:
         raise ValueError("Argument 'case_patts' has no data!")
 
     extracted = data.assign(
-        Case_IDs = pd.NA,
         Case_ID = pd.NA
     )
 
@@ -550,13 +596,13 @@ def extract_cases(data: DataFrame, case_patts: dict) -> DataFrame:
         if idx.empty:
             continue
 
-        rx_patt = fr"D[P]?\s*[-_/]?({case_patts[cocd]})"
-        extracted.loc[idx, "Case_IDs"] = extracted.loc[idx, "Text"].str.findall(rx_patt)
-        extracted.loc[idx, "Case_ID"] = extracted.loc[idx, "Case_IDs"].apply(
-            lambda x: x[0] if len(x) == 1 else pd.NA
-        )
+        rx_patt = _compile_case_rx(case_patts[cocd])
+        texts = extracted.loc[idx, "Text"]
+
+        # a case ID is assigned only if the text contains exactly one
+        single = texts.str.count(rx_patt).eq(1).fillna(False).astype(bool)
+        extracted.loc[single[single].index, "Case_ID"] = texts[single].str.extract(rx_patt, expand = False)
 
-    extracted.drop("Case_IDs", axis = 1, inplace = True)
     extracted["Case_ID"] = pd.to_numeric(extracted["Case_ID"]).astype("UInt64")
 
     return extracted
@@ -582,11 +628,12 @@ def compact_data(acc_data: DataFrame, disp_data: DataFrame) -> DataFrame:
     if acc_data.empty:
         raise ValueError("Argument 'acc_data' contains no records!")
 
-    DUMMY_CASE_ID = 0
+    # only the disputes of the cases found in the accounting data
+    # enter the join, the missing case IDs then match no dispute
+    case_ids = acc_data["Case_ID"].dropna().unique()
+    disputes = disp_data[disp_data["Case_ID"].isin(case_ids)]
 
-    acc_data["Case_ID"].fillna(DUMMY_CASE_ID, inplace = True)
-    compacted = pd.merge(acc_data, disp_data, how = "left", on = "Case_ID")
-    compacted["Case_ID"].mask(compacted["Case_ID"] == DUMMY_CASE_ID, pd.NA, inplace = True)
+    compacted = pd.merge(acc_data, disputes, how = "left", on = "Case_ID")
     compacted["Status_Sales"].fillna("", inplace = True)
     compacted.sort_values(["Case_ID"], ascending = False, inplace = True)
 
@@ -632,85 +679,85 @@ def check_consistency(data: DataFrame) -> DataFrame:
         _RC_BELOW_THRESHOLD
     )
 
-    copied = data.copy()
-
-    copied = copied.assign(
+    # assign() returns a new frame, no further copy of the data is needed
+    copied = data.assign(
         Contains_Credit_Note = False
     )
 
-    checked = copied.query("Case_ID.notna()").copy()
-    missing_id = copied.query("Case_ID.isna()").copy()
+    # the checks are applied to the items with a case ID in place,
+    # the data is not split into separate subsets and concatenated
+    has_case = copied["Case_ID"].notna()
 
-    missing_id["Warnings"] = "Case ID missing!"
+    copied.loc[~has_case, "Warnings"] = "Case ID missing!"
 
     # check if status sales already
     # contains credit note number
-    checked["Contains_Credit_Note"] = checked.apply(
-        lambda x: str(x["Document_Number"]) in x["Status_Sales"], axis = 1
-    )
+    copied["Contains_Credit_Note"] = has_case & (np.char.find(
+        copied["Status_Sales"].to_numpy(dtype = str),
+        copied["Document_Number"].to_numpy(dtype = str)
+    ) >= 0)
+
+    credit_note = copied["Contains_Credit_Note"]
+    root_cause = copied["Root_Cause"]
+    status = copied["Status"]
 
     # inform the user about any invalid combinations of parameters per case
-    valid_comb_a = checked["Contains_Credit_Note"] & (checked["Root_Cause"] == _RC_CREDIT_NOTE_ISSUED) & checked["Status"].isin((1, 2, 3))
-    valid_comb_b = checked["Contains_Credit_Note"] & (checked["Root_Cause"] == _RC_DISPUTE_UNJUSTIFIED) & checked["Status"].isin((1, 2))
-    valid_comb_c = ~checked["Contains_Credit_Note"] & checked["Root_Cause"].isin((_RC_UNUSED, _RC_CREDIT_NOTE_ISSUED)) & checked["Status"].isin((1, 2, 3))
-    valid_comb_d = ~checked["Contains_Credit_Note"] & (checked["Root_Cause"] == _RC_PAYMENT_AGREEMENT) & (checked["Status"] == 2)
-    valid_comb_e = checked["Contains_Credit_Note"] & (checked["Root_Cause"] == _RC_PAYMENT_AGREEMENT) & checked["Status"].isin((2, 3))
+    valid_comb_a = credit_note & (root_cause == _RC_CREDIT_NOTE_ISSUED) & status.isin((1, 2, 3))
+    valid_comb_b = credit_note & (root_cause == _RC_DISPUTE_UNJUSTIFIED) & status.isin((1, 2))
+    valid_comb_c = ~credit_note & root_cause.isin((_RC_UNUSED, _RC_CREDIT_NOTE_ISSUED)) & status.isin((1, 2, 3))
+    valid_comb_d = ~credit_note & (root_cause == _RC_PAYMENT_AGREEMENT) & (status == 2)
+    valid_comb_e = credit_note & (root_cause == _RC_PAYMENT_AGREEMENT) & status.isin((2, 3))
 
     valid_comb = valid_comb_a | valid_comb_b | valid_comb_c | valid_comb_d | valid_comb_e
-    checked.loc[~valid_comb, "Message"] = "Case skipped. Reason: Incorrect case parameter combination!"
-    checked.loc[~valid_comb, "Inconsistent"] = True
+    invalid_comb = has_case & ~valid_comb
+    copied.loc[invalid_comb, "Message"] = "Case skipped. Reason: Incorrect case parameter combination!"
+    copied.loc[invalid_comb, "Inconsistent"] = True
 
     # check data for entries with devaluated Case IDs
     # whose params cannot be changed in DMS
-    deval = checked.query(f"Status == {_STATUS_DEVALUATED}")
-    checked.loc[deval.index, "Message"] = "Case skipped. Reason: Devaluated Case ID assigned!"
-    checked.loc[deval.index, "Inconsistent"] = True
+    deval = has_case & status.eq(_STATUS_DEVALUATED).fillna(False)
+    copied.loc[deval, "Message"] = "Case skipped. Reason: Devaluated Case ID assigned!"
+    copied.loc[deval, "Inconsistent"] = True
 
     # check data for entries for invalid Case IDs
-    inv_id = checked.query("Case_ID.notna() and Status.isna()")
-    checked.loc[inv_id.index, "Message"] = "Case skipped. Reason: Invalid Case ID!"
-    checked.loc[inv_id.index, "Inconsistent"] = True
-
-    exceed_chars = checked.query(f"New_Status_Sales.str.len() > {MAX_CHARS}")
-    checked.loc[exceed_chars.index, "Message"] = "Case skipped. Reason: Maximum number of 50 characters in 'Status sales' exceeded!"
-    checked.loc[exceed_chars.index, "Inconsistent"] = True
+    inv_id = has_case & status.isna()
+    copied.loc[inv_id, "Message"] = "Case skipped. Reason: Invalid Case ID!"
+    copied.loc[inv_id, "Inconsistent"] = True
 
-    # check data for entries for invalid Case IDs
-    id_not_found = checked.query("Case_ID.isna()")
-    checked.loc[id_not_found.index, "Warnings"] = "Case ID not found in text!"
-    checked.loc[id_not_found.index, "Inconsistent"] = True
+    exceed_chars = has_case & copied["New_Status_Sales"].str.len().gt(MAX_CHARS).fillna(False)
+    copied.loc[exceed_chars, "Message"] = "Case skipped. Reason: Maximum number of 50 characters in 'Status sales' exceeded!"
+    copied.loc[exceed_chars, "Inconsistent"] = True
 
     # check data for entries where FBL5N debitor differs from DMS debitor
-    unequal_accs = checked.query("Branch != Debitor")
-    checked.loc[unequal_accs.index, "Warnings"] = "FBL5N and DMS debitors not equal!"
+    unequal_accs = has_case & copied["Branch"].ne(copied["Debitor"]).fillna(False)
+    copied.loc[unequal_accs, "Warnings"] = "FBL5N and DMS debitors not equal!"
     # this is kind of an insignificant inconsistency which does not prevent hte case to be processed in DMS
-    checked.loc[unequal_accs.index, "Inconsistent"] = False
+    copied.loc[unequal_accs, "Inconsistent"] = False
 
     # check data for entries where other than standard root cause is used
-    unexpected_rtc = checked.query(f"Root_Cause not in {StandardRootCauses} and Case_ID.notna()")
-    checked.loc[unexpected_rtc.index, "Warnings"] = "Unexpected root cause used!"
-    checked.loc[unexpected_rtc.index, "Inconsistent"] = True
-
-    multi_precredits = checked["Status_Sales"].str.contains(r"501\d{6}.*?501\d{6}", regex = True)
-    checked.loc[multi_precredits, "Message"] = "Case skipped. Reason: Status sales contains multiple 501* numbers!"
-    checked.loc[multi_precredits, "Inconsistent"] = True
+    unexpected_rtc = has_case & ~root_cause.isin(StandardRootCauses)
+    copied.loc[unexpected_rtc, "Warnings"] = "Unexpected root cause used!"
+    copied.loc[unexpected_rtc, "Inconsistent"] = True
 
-    result = pd.concat([checked, missing_id])
+    multi_precredits = has_case & copied["Status_Sales"].str.contains(_MULTI_PRECREDIT_RX).fillna(False)
+    copied.loc[multi_precredits, "Message"] = "Case skipped. Reason: Status sales contains multiple 501* numbers!"
+    copied.loc[multi_precredits, "Inconsistent"] = True
 
-    return result
+    return copied
 
 
-def search_matches(data: DataFrame, cntry_rules: dict) -> DataFrame:
+def search_matches(data: DataFrame, rules: dict) -> DataFrame:
     """
     Searches data for cases to process based on defined criteria.
 
     Params:
     -------
     data:
-        Merged FBL5N and DMS data containing credit notes and
+        Merged FBL5N and DMS data containing credit notes and disputes.
 
-    cntry_rules:
-        Country-specific processing rules (base threshold, tax thresholds, etc...)
+    rules:
+        Processing rules (base threshold, tax thresholds, etc...)
+        of the countries whose data will be evaluated.
 
     Returns:
     --------
@@ -720,58 +767,81 @@ def search_matches(data: DataFrame, cntry_rules: dict) -> DataFrame:
     if data.empty:
         raise ValueError("Argument 'data' contains no records!")
 
-    if len(cntry_rules) == 0:
-        raise ValueError("Argument 'cntry_rules' has no records!")
+    if len(rules) == 0:
+        raise ValueError("Argument 'rules' has no records!")
+
+    bas_threshs = {}
+    tax_threshs = {}
+
+    for cntry_rules in rules.values():
 
-    bas_thresh = cntry_rules["base_threshold"]
-    tax_threshs = cntry_rules["tax_thresholds"]
-    cocd = cntry_rules["company_code"]
+        cocd = cntry_rules["company_code"]
+        bas_thresh = cntry_rules["base_threshold"]
 
-    # applies to situations/countries, where there's no tolerance limit
-    # for the difference between disputed and credit note amounts
-    if bas_thresh == 0:
-        bas_thresh += 0.01
+        # applies to situations/countries, where there's no tolerance limit
+        # for the difference between disputed and credit note amounts
+        if bas_thresh == 0:
+            bas_thresh += 0.01
 
-    subset = data[data["Company_Code"] == cocd]
+        bas_threshs[cocd] = bas_thresh
+
+        for tax, thresh in cntry_rules["tax_thresholds"].items():
+            tax_threshs[(cocd, tax)] = thresh
+
+    # select datasubset for the evaluated company codes from the entire dataset
+    subset = data[data["Company_Code"].isin(frozenset(bas_threshs))].copy()
+    found_cocds = set(subset["Company_Code"].unique())
+
+    for cocd in bas_threshs:
+        if cocd not in found_cocds:
+            _logger.warning(f"Data contains no records for company code '{cocd}'!")
 
     if subset.empty:
-        _logger.warning(f"Data contains no records for company code '{cocd}'!")
         return subset
 
-    # select  datasubset for a particuler company code from the entire dataset
-    open_items = subset.query("Clearing_Document.isna() and Case_ID.notna()").copy()
-    closed_items = subset.query("Clearing_Document.notna() and Case_ID.notna()").copy()
-    missing_id = subset.query("Case_ID.isna()").copy()
+    # the items are split by masks evaluated once for the subset,
+    # instead of parsing and evaluating three query expressions
+    has_case = subset["Case_ID"].notna()
+    cleared = subset["Clearing_Document"].notna()
+
+    open_items = subset[has_case & ~cleared].copy()
+    closed_items = subset[has_case & cleared]
 
     # sum document amounts based on case IDs - this is needed if there are > 1 case ID per credit note
-    open_items["DC_Amount_Sum"] = open_items.groupby("Case_ID")["DC_Amount"].transform("sum")
+    open_items["DC_Amount_Sum"] = open_items.groupby(
+        ["Company_Code", "Case_ID"], observed = True)["DC_Amount"].transform("sum")
 
-    # calculate threshold values based on credit note tax codes
-    open_items["Threshold"] = open_items["Tax"].apply(
-        lambda x: tax_threshs[x] if x in tax_threshs else bas_thresh
-    ).astype("float")
+    # calculate threshold values based on credit note tax codes, the base
+    # threshold of the company code applies to the remaining tax codes
+    # while items with no tax code get no threshold
+    tax_keys = pd.MultiIndex.from_arrays([open_items["Company_Code"], open_items["Tax"]])
+    bas_vals = open_items["Company_Code"].map(bas_threshs).astype("float")
 
-    # sum disputed amounts with DC amounts and compare the result with
-    # the previously calculated threshold value
-    open_items = open_items.assign(
-        Total_Sum = open_items["DC_Amount_Sum"] + open_items["Disputed_Amount"]
-    )
+    open_items["Threshold"] = Series(
+        tax_keys.map(tax_threshs), index = open_items.index, dtype = "float"
+    ).fillna(bas_vals).mask(open_items["Tax"].isna())
 
-    # identify amounts that are below threshold
-    open_items = open_items.assign(
-        Amount_Match = open_items["Total_Sum"].abs() < open_items["Threshold"]
-    )
+    # sum disputed amounts with DC amounts and compare the result with
+    # the previously calculated threshold value to identify amounts that
+    # are below threshold, the comparison runs on the plain arrays
+    total_sum = open_items["DC_Amount_Sum"].to_numpy() + open_items["Disputed_Amount"].to_numpy()
+    open_items["Total_Sum"] = total_sum
+    open_items["Amount_Match"] = np.abs(total_sum) < open_items["Threshold"].to_numpy()
 
     # generate new case params based on the above precalculations
     updated_oi = _generate_oi_params(open_items)
     updated_ci = _generate_ci_params(closed_items)
 
-    # copy all updates to the original company code subset
-    result = pd.concat([updated_oi, updated_ci, missing_id])
+    # copy all updates to the original data subset, the item groups
+    # are disjoint, hence the updates are written to the subset in place
+    for col in ("DC_Amount_Sum", "Threshold", "Total_Sum", "Amount_Match"):
+        subset[col] = updated_oi[col]
 
-    assert result.shape[0] == subset.shape[0], "Original data and evaluate data contain different number of rows!"
+    for updated in (updated_oi, updated_ci):
+        for col in ("Message", "New_Status", "New_Root_Cause", "New_Status_Sales", "Changed", "Modified"):
+            subset.loc[updated.index, col] = updated[col]
 
-    return result
+    return subset
 
 def create_closing_input(data: DataFrame) -> list:
     """
@@ -789,7 +859,6 @@ def create_closing_input(data: DataFrame) -> list:
     Data used as the input for subsequent case modification in DMS.
     """
 
-    recs = []
     subset = data.query("Inconsistent == False and (Changed == True or Modified == True)")
 
     tot_count = subset.shape[0]
@@ -801,13 +870,21 @@ def create_closing_input(data: DataFrame) -> list:
     _logger.debug(f"Total cases to process: {tot_count}.")
 
     _logger.info("Compiling input data for case processing in DMS ...")
-    for _ , row in subset.iterrows():
-        recs.append(Record(
-            CaseID = row["Case_ID"],
-            Status = row["New_Status"] if not pd.isna(row["New_Status"]) else None,
-            RootCause = row["New_Root_Cause"] if not pd.isna(row["New_Root_Cause"]) else None,
-            StatusSales = row["New_Status_Sales"] if not pd.isna(row["New_Status_Sales"]) else None
-        ))
+
+    # missing values are replaced by None for all columns at once,
+    # the records are then built from the plain column arrays
+    params = subset[["Case_ID", "New_Status", "New_Root_Cause", "New_Status_Sales"]].astype("object")
+    params = params.where(params.notna(), None)
+
+    recs = [
+        Record(CaseID = case_id, Status = stat, RootCause = root_cause, StatusSales = stat_sales)
+        for case_id, stat, root_cause, stat_sales in zip(
+            params["Case_ID"].to_numpy(),
+            params["New_Status"].to_numpy(),
+            params["New_Root_Cause"].to_numpy(),
+            params["New_Status_Sales"].to_numpy()
+        )
+    ]
 
     return recs
 
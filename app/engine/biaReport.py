@@ -13,12 +13,53 @@ Version history:
                correctly in reports.
 """
 
-from datetime import datetime, date
+from functools import lru_cache
+from os import replace
 from os.path import join
+import numpy as np
 import pandas as pd
-from pandas import ExcelWriter, DataFrame, Series
+from pandas import DataFrame, Series
 from xlsxwriter.workbook import Workbook
-from xlsxwriter.format import Format
+from xlsxwriter.utility import xl_col_to_name, xl_range, xl_rowcol_to_cell
+
+# day zero of the excel serial date format
+_EXCEL_EPOCH = pd.Timestamp(1899, 12, 30)
+
+# sheet custom data formats
+_FORMAT_SPECS = {
+    "money": {"num_format": "#,##0.00", "align": "center"},
+    "category": {"num_format": "000", "align": "center"},
+    "date": {"num_format": "mm.dd.yyyy", "align": "center"},
+    "general": {"align": "center"},
+    "header": {
+        "align": "center",
+        "bg_color": "#F06B00",
+        "font_color": "white",
+        "bold": True
+    }
+}
+
+# data formats of the report columns,
+# other columns use the general format
+_COLUMN_FORMATS = {
+    "Disputed_Amount": "money",
+    "DC_Amount": "money",
+    "Category": "category",
+    "Solved_On": "date",
+    "Created_On": "date"
+}
+
+# cell of the HTML summary table row
+_TBL_CELL = '<td style="border: purple 2px solid; padding: 5px">{}</td>'
+
+# the report texts are written as they are, without
+# any conversion to numbers, formulas or hyperlinks
+_WORKBOOK_OPTIONS = {
+    "constant_memory": True,
+    "strings_to_numbers": False,
+    "strings_to_formulas": False,
+    "strings_to_urls": False
+}
 
 def _get_col_width(vals: Series, fld_name: str) -> int:
     """
@@ -27,11 +68,13 @@ def _get_col_width(vals: Series, fld_name: str) -> int:
     in the column name and column data strings.
     """
 
-    vals = vals.astype("string").dropna().str.len()
-    vals = list(vals)
-    vals.append(len(str(fld_name)))
+    # the maximum is taken by pandas, missing values are skipped
+    max_len = vals.astype("string").str.len().max()
+
+    if pd.isna(max_len):
+        max_len = 0
 
-    return max(vals)
+    return max(int(max_len), len(str(fld_name)))
 
 def _col_to_rng(data: DataFrame, first_col: str, last_col: str = None,
                 row: int = -1, last_row: int = -1) -> str:
@@ -70,139 +113,81 @@ def _col_to_rng(data: DataFrame, first_col: str, last_col: str = None,
     else:
         assert False, "Argument 'first_col' has invalid type!"
 
-    first_col_idx += 1
-    prim_lett_idx = first_col_idx // 26
-    sec_lett_idx = first_col_idx % 26
-
-    lett_a = chr(ord('@') + prim_lett_idx) if prim_lett_idx != 0 else ""
-    lett_b = chr(ord('@') + sec_lett_idx) if sec_lett_idx != 0 else ""
-    lett = "".join([lett_a, lett_b])
-
     if last_col is None:
-        last_lett = lett
+        last_col_idx = first_col_idx
+    elif isinstance(last_col, str):
+        last_col_idx = data.columns.get_loc(last_col)
+    elif isinstance(last_col, int):
+        last_col_idx = last_col
     else:
+        assert False, "Argument 'last_col' has invalid type!"
 
-        if isinstance(last_col, str):
-            last_col_idx = data.columns.get_loc(last_col)
-        elif isinstance(last_col, int):
-            last_col_idx = last_col
-        else:
-            assert False, "Argument 'last_col' has invalid type!"
-
-        last_col_idx += 1
-        prim_lett_idx = last_col_idx // 26
-        sec_lett_idx = last_col_idx % 26
-
-        lett_a = chr(ord('@') + prim_lett_idx) if prim_lett_idx != 0 else ""
-        lett_b = chr(ord('@') + sec_lett_idx) if sec_lett_idx != 0 else ""
-        last_lett = "".join([lett_a, lett_b])
-
+    # the row numbers are 1-based, while xlsxwriter uses zero-based indices
     if row == -1:
-        rng = ":".join([lett, last_lett])
-    elif first_col == last_col and row != -1 and last_row == -1:
-        rng = f"{lett}{row}"
-    elif first_col == last_col and row != -1 and last_row != -1:
-        rng = ":".join([f"{lett}{row}", f"{lett}{last_row}"])
-    elif first_col != last_col and row != -1 and last_row == -1:
-        rng = ":".join([f"{lett}{row}", f"{last_lett}{row}"])
-    elif first_col != last_col and row != -1 and last_row != -1:
-        rng = ":".join([f"{lett}{row}", f"{last_lett}{last_row}"])
+        rng = ":".join([xl_col_to_name(first_col_idx), xl_col_to_name(last_col_idx)])
+    elif first_col == last_col and last_row == -1:
+        rng = xl_rowcol_to_cell(row - 1, first_col_idx)
+    elif last_row == -1:
+        rng = xl_range(row - 1, first_col_idx, row - 1, last_col_idx)
     else:
-        assert False, "Undefined argument combination!"
+        rng = xl_range(row - 1, first_col_idx, last_row - 1, last_col_idx)
 
     return rng
 
-def _write_data(data: DataFrame, wrtr: ExcelWriter, sht_name: str):
+def _write_data(data: DataFrame, sht):
     """
-    Writes a DataFrame object to an excel file.
+    Writes DataFrame values to a report sheet \n
+    below the header row.
     """
 
-    # format headers
-    data.columns = data.columns.str.replace("_", " ", regex = False)
+    # missing values are written as blank cells, the rows need
+    # to be written in order, since the sheet flushes each row
+    # to the file once the next one is written
+    vals = data.astype("object").where(data.notna(), None)
 
-    # write date to report file
-    data.to_excel(wrtr, index = False, sheet_name = sht_name)
+    # the frame is converted to row lists at once, instead
+    # of building a tuple per row by iterating the frame
+    rows = vals.to_numpy().tolist()
+    del vals
 
-    # replace spaces in column names back with underscores for a better
-    # field manupulation in the code
-    data.columns = data.columns.str.replace(" ", "_", regex = False)
+    for row_idx, row in enumerate(rows, 1):
+        sht.write_row(row_idx, 0, row)
 
 def _generate_formats(report: Workbook) -> dict:
+    """
+    Adds the report data formats to a workbook.
+    """
 
-    formats = {}
-
-    # define sheet custom data formats
-    formats["money"] = report.add_format({"num_format": "#,##0.00", "align": "center"})
-    formats["category"] = report.add_format({"num_format": "000", "align": "center"})
-    formats["date"]  = report.add_format({"num_format": "mm.dd.yyyy", "align": "center"})
-    formats["general"] = report.add_format({"align": "center"})
-    formats["header"] = report.add_format({
-        "align": "center",
-        "bg_color": "#F06B00",
-        "font_color": "white",
-        "bold": True
-    })
+    formats = {name: report.add_format(spec) for name, spec in _FORMAT_SPECS.items()}
 
     return formats
 
 def _format_header(sht, data: DataFrame, header_idx: int, fmt):
     """
-    Formats the header of the report sheet.
+    Writes and formats the header of the report sheet.
     """
 
-    # format report header
-    sht.conditional_format(
-        _col_to_rng(data, data.columns[0], data.columns[-1], row = header_idx),
-        {"type": "no_errors", "format": fmt}
-    )
+    # write report header formatted directly, the column names
+    # are displayed with spaces instead of underscores
+    sht.write_row(header_idx - 1, 0, data.columns.str.replace("_", " ", regex = False), fmt)
 
     # freeze data header row and set autofiler on all fields
     sht.freeze_panes(header_idx, 0)
 
-def _get_column_format(col_name: str, formats: dict) -> Format:
-    """
-    Returns appropriate data format
-    for a given report column.
-    """
-
-    if col_name == "Disputed_Amount":
-        fmt = formats["money"]
-    elif col_name == "DC_Amount":
-        fmt = formats["money"]
-    elif col_name == "Category":
-        fmt = formats["category"]
-    elif col_name in ("Solved_On", "Created_On"):
-        fmt = formats["date"]
-    else:
-        fmt = formats["general"]
-
-    return fmt
-
-def _to_excel_serial(day: date) -> int:
-    """
-    Converts a datetime object
-    into excel-compatible
-    date integer serial format.
-    """
-
-    delta = day - datetime(1899, 12, 30).date()
-    days = delta.days
-
-    return days
-
 def _convert_data(data: DataFrame) -> DataFrame:
     """Converts data columns to specific data types."""
 
-    result = data.copy()
+    # a shallow copy shares the data of the unmodified columns,
+    # while the converted columns replace the original ones
+    result = data.copy(deep = False)
 
     # convert datetime format to excel native serial date format
     # in order to format the date vals correctly in the report
     for col_name in ("Solved_On", "Created_On"):
-        result[col_name] = result[col_name].apply(
-            lambda x: _to_excel_serial(x) if not pd.isna(x) else x
-        )
+        days = pd.to_datetime(data[col_name], errors = "coerce") - _EXCEL_EPOCH
+        result[col_name] = days.dt.days.astype("Int32")
 
-    result["Category"] = pd.to_numeric(result["Category"]).astype("UInt8")
+    result["Category"] = pd.to_numeric(data["Category"]).astype("UInt8")
 
     return result
 
@@ -242,21 +227,23 @@ def create_report(data: DataFrame, file_path: str, sheet_name: str, field_order:
     data = data.reindex(columns = field_order)
     converted = _convert_data(data)
 
-    with ExcelWriter(file_path, engine = "xlsxwriter") as wrtr:
-
-        _write_data(converted, wrtr, sheet_name)
+    # the report is written in the constant memory mode, the rows are
+    # streamed to the file, instead of being kept in memory until close
+    with Workbook(file_path, _WORKBOOK_OPTIONS) as report:
 
-        # get report data sheet and generate column formats
-        sht = wrtr.sheets[sheet_name]
-        formats = _generate_formats(wrtr.book)
+        # create report data sheet and generate column formats
+        sht = report.add_worksheet(sheet_name)
+        formats = _generate_formats(report)
 
+        # the column params apply to the data written afterwards
         for col_name in converted.columns:
             col_width = _get_col_width(converted[col_name], col_name) + 2
             col_rng = _col_to_rng(converted, col_name)
-            col_fmt = _get_column_format(col_name, formats)
+            col_fmt = formats[_COLUMN_FORMATS.get(col_name, "general")]
             sht.set_column(col_rng, col_width, col_fmt)  # apply new column params
 
         _format_header(sht, converted, header_idx = 1, fmt = formats["header"])
+        _write_data(converted, sht)
 
 def summarize(data: DataFrame, cocd: str, country: str) -> str:
     """
@@ -279,52 +266,71 @@ def summarize(data: DataFrame, cocd: str, country: str) -> str:
     A HTML table row contianing summarized data parameters.
     """
 
+    # cases changed in DMS without an error, the case IDs are
+    # deduplicated on the plain array, missing IDs are excluded
+    processed = (data["Changed"] & ~data["IsError"] & data["Case_ID"].notna()).to_numpy()
+    case_ids = data["Case_ID"].to_numpy(dtype = "uint64", na_value = 0)
+    new_stats = data["New_Status"]
+
     # all cases that were solved (from status 1 to status 2)
-    solved_cnt = data.query(
-        "New_Status == 2 and Changed == True and IsError == False"
-    )["Case_ID"].nunique()
+    solved_cnt = np.unique(case_ids[processed & new_stats.eq(2).to_numpy()]).size
 
     # all cases that were closed (from status 1/2 to status 2)
-    closed_cnt = data.query(
-        "New_Status == 3 and Changed == True and IsError == False"
-    )["Case_ID"].nunique()
+    closed_cnt = np.unique(case_ids[processed & new_stats.eq(3).to_numpy()]).size
+
+    # the item flags are counted in a single reduction
+    # over a boolean matrix, one column per count
+    counts = DataFrame({
+
+        # number of all open credit notes processed
+        "open": data["Clearing_Document"].isna().to_numpy(),
 
-    # number of all open credit notes processed
-    total_open_cnt = data[data["Clearing_Document"].isna()].shape[0]
+        # number of items skipped due to incorrect case parameter combination
+        "inconsistent": data["Inconsistent"].to_numpy(dtype = bool),
 
-    # number of items skipped due to incorrect case parameter combination
-    inconsistent_cnt = data[data["Inconsistent"]].shape[0]
+        # number of cases the prapeters of which were modified while keeping their oroginal status
+        "modified": data["Modified"].to_numpy(dtype = bool),
 
-    # number of cases the prapeters of which were modified while keeping their oroginal status
-    modified_cnt = data[data["Modified"]].shape[0]
+        # number of cases where warnings were raised
+        "warnings": data["Warnings"].notna().to_numpy(),
 
-    # number of cases where warnings were raised
-    warnings_cnt = data[data["Warnings"].notna()].shape[0]
+        # number of cases unprocessed due to an error raised by DMS
+        "errors": data["IsError"].to_numpy(dtype = bool),
 
-    # number of cases unprocessed due to an error raised by DMS
-    errors_cnt = data[data["IsError"]].shape[0]
+        # number of credit notes without case ID
+        "no_id": data["Case_ID"].isna().to_numpy()
 
-    # number of credit notes without case ID
-    no_id_doc_cnt = data[data["Case_ID"].isna()].shape[0]
+    }).sum()
+
+    total_open_cnt = counts["open"]
+    inconsistent_cnt = counts["inconsistent"]
+    modified_cnt = counts["modified"]
+    warnings_cnt = counts["warnings"]
+    errors_cnt = counts["errors"]
+    no_id_doc_cnt = counts["no_id"]
 
     # create HTML row summarizing data
-    tbl_row = f"""
-        <tr>
-            <td style="border: purple 2px solid; padding: 5px">{country}</td>
-            <td style="border: purple 2px solid; padding: 5px">{cocd}</td>
-            <td style="border: purple 2px solid; padding: 5px">{modified_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{solved_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{closed_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{inconsistent_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{total_open_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{no_id_doc_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{warnings_cnt}</td>
-            <td style="border: purple 2px solid; padding: 5px">{errors_cnt}</td>
-        </tr>
-    """
+    cells = "".join(_TBL_CELL.format(val) for val in (
+        country, cocd, modified_cnt, solved_cnt, closed_cnt, inconsistent_cnt,
+        total_open_cnt, no_id_doc_cnt, warnings_cnt, errors_cnt
+    ))
+
+    tbl_row = f"<tr>{cells}</tr>"
 
     return tbl_row
 
+@lru_cache(maxsize = 8)
+def _read_template(file_path: str) -> str:
+    """
+    Reads a notification template. The template is cached,
+    since it doesn't change during the application runtime.
+    """
+
+    with open(file_path, 'r', encoding = "utf-8") as stream:
+        template = stream.read()
+
+    return template
+
 def create_notification(notification_path: str, template_path: str,
                         net_dir: str, net_subdir: str, summary: str):
     """
@@ -352,12 +358,16 @@ def create_notification(notification_path: str, template_path: str,
     None.
     """
 
-    with open(template_path, 'r', encoding = "utf-8") as stream:
-        template = stream.read()
-
+    template = _read_template(template_path)
     user_report_dir = join(net_dir, net_subdir)
     notif = template.replace("$ReportPath$", user_report_dir)
     notif = notif.replace("<tr><td>$TblRows$</td></tr>", summary)
 
-    with open(notification_path, 'w', encoding = "utf-8") as stream:
+    # the notification is written to a temporary file first and then
+    # renamed, so that no incomplete notification is left if writing fails
+    tmp_path = f"{notification_path}.tmp"
+
+    with open(tmp_path, 'w', encoding = "utf-8") as stream:
         stream.write(notif)
+
+    replace(tmp_path, notification_path)
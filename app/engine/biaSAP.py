@@ -9,9 +9,9 @@ SAP system.
 from enum import Enum
 from os.path import isfile
 from subprocess import Popen, TimeoutExpired
+from pywintypes import error as WinError
 import win32com.client
-from win32ui import FindWindow
-from win32ui import error as WinError
+from win32gui import FindWindow
 from win32com.client import CDispatch
 
 class Systems(Enum):
@@ -30,12 +30,12 @@ class LoginError(Exception):
 def _window_exists(name: str) -> bool:
     """Checks wheter SAP GUI process is running."""
 
+    # depending on the pywin32 build, a missing window is reported
+    # either by a zero window handle or by raising an error
     try:
-        FindWindow(None, name)
+        return FindWindow(None, name) != 0
     except WinError:
         return False
-    else:
-        return True
 
 def _start_process(exe_path: str):
     """Starts a new SAP GUI process."""
@@ -8,9 +8,13 @@ parameters defined in states.json.
 
 from datetime import datetime as dt
 from os.path import join
+import re
 import sys
 from biaController import load_app_config, save_states
 
+# date in the 'yyyy-mm-dd' format
+_DATE_RX = re.compile(r"\d{4}-\d{2}-\d{2}")
+
 def get_user_input() -> str:
     """
     Returns a string date
@@ -35,9 +39,15 @@ def get_user_input() -> str:
         if val.lower() == 'q':
             return None
 
+        # the format is checked first, strptime()
+        # then rejects non-existing calendar dates
+        if _DATE_RX.fullmatch(val) is None:
+            print("Invalid value entered!")
+            continue
+
         try:
             dt.strptime(val, "%Y-%m-%d")
-        except Exception:
+        except ValueError:
             print("Invalid value entered!")
             continue
 